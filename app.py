@@ -1,58 +1,164 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from typing import Iterator, List, Optional
 import uvicorn
+import orjson
 import asyncio
+import functools
+import sys
 import time
 from datetime import datetime
 import atexit
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from config.settings import settings, check_environment
 from models.kanana_model import KananaModel
 from services.vector_service import VectorService
 from services.gpt_service import GPTService
 from utils.memory_manager import MessageQueue
+from utils.semantic_cache import SemanticCache
+from utils.conversation_collector import format_conversation
+from utils.cors_middleware import FastCORSMiddleware
 from utils.mlops_manager import MLOpsManager  # 🚀 새로운 통합 MLOps 매니저
 
 # FastAPI 앱 초기화
-app = FastAPI(title="RAG Chat API with Advanced MLOps", version="3.0.0")
-
-# CORS 설정
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+app = FastAPI(
+    title="RAG Chat API with Advanced MLOps",
+    version="3.0.0",
+    default_response_class=ORJSONResponse  # orjson 직렬화 (stdlib json보다 빠름, 자주 폴링되는 엔드포인트는 직접 반환해 jsonable_encoder도 생략)
 )
 
+# CORS 설정 (허용 origin 집합과 응답 헤더를 미리 계산한 경량 미들웨어)
+app.add_middleware(FastCORSMiddleware, allowed_origins=settings.allowed_origins)
+
 # 전역 변수들
 kanana_model = None
 vector_service = None
 gpt_service = None
+semantic_cache = None
 memory = MessageQueue(cnt=settings.memory_max_count)
 mlops_manager = None  # 🚀 통합 MLOps 매니저
+_ready = False  # 채팅 서비스(모델/벡터/GPT) 준비 여부 (startup에서 True, shutdown에서 False)
+
+# 검색 결과 보관소 (search_id → search_results, 최근 사용 순 LRU)
+# include_search_results=false 요청 전용. 워커 프로세스마다 따로 있으므로
+# GET /search/{sid}는 단일 워커(WORKERS=1)에서만 항상 조회됨
+SEARCH_CACHE_SIZE = 256
+_search_cache = OrderedDict()
+
+def _store_search_results(search_results: List[dict]) -> str:
+    """검색 결과를 보관하고 조회용 search_id 반환"""
+    sid = uuid.uuid4().hex
+    _search_cache[sid] = search_results
+    if len(_search_cache) > SEARCH_CACHE_SIZE:
+        _search_cache.popitem(last=False)
+    return sid
+
+def _search_summary(search_results: List[dict], inline: bool = True) -> dict:
+    """응답 본문에 싣는 검색 결과 (기본은 전체 목록, inline=False면 search_id + 미리보기)"""
+    if inline:
+        return {"search_results": search_results}
+    
+    return {
+        "search_id": _store_search_results(search_results),
+        "top_result_preview": search_results[0]["document"][:200] if search_results else ""
+    }
+
+# 성능 통계 (워커 프로세스별 누적값, 모든 갱신은 이벤트 루프 스레드에서 수행)
+class RequestStats:
+    """요청 통계 카운터 (__slots__ 속성 증가만으로 갱신)"""
+    __slots__ = ("queries", "search_ms", "gpt_ms", "embed_ms")
+    
+    def __init__(self):
+        self.queries = 0
+        self.search_ms = 0.0
+        self.gpt_ms = 0.0
+        self.embed_ms = 0.0
+    
+    def snapshot(self) -> dict:
+        """통계 스냅샷 (이벤트 루프 스레드에서 호출되므로 중간 상태가 섞이지 않음)"""
+        return {
+            "total_queries": self.queries,
+            "total_search_time": self.search_ms,
+            "total_gpt_time": self.gpt_ms,
+            "total_embedding_time": self.embed_ms
+        }
+
+stats = RequestStats()
+
+# 응답 반환 후 실행되는 백그라운드 태스크 (GC 방지 및 예외 확인용)
+background_tasks_set = set()
+
+def _on_background_task_done(task: asyncio.Task):
+    """백그라운드 태스크 완료 처리"""
+    background_tasks_set.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ 백그라운드 작업 오류: {task.exception()}")
+
+def _schedule_background(coro) -> asyncio.Task:
+    """코루틴을 백그라운드 태스크로 등록"""
+    task = asyncio.create_task(coro)
+    background_tasks_set.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+# MLOps 대화 수집 전용 스레드 (벡터 저장과 병렬 실행, 수집 순서는 요청 순서대로 유지)
+_mlops_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlops")
 
-stats = {
-    "total_queries": 0,
-    "total_search_time": 0,
-    "total_gpt_time": 0,
-    "total_embedding_time": 0
-}
+# 대화 문서 저장 버퍼 (모아서 한 번에 임베딩 + ChromaDB 저장)
+WRITE_QUEUE_SIZE = 1024
+WRITE_BATCH_SIZE = settings.vector_write_batch_size
+WRITE_FLUSH_INTERVAL = settings.vector_write_interval_ms / 1000  # 초
+_write_buf: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+
+async def _drain_writes():
+    """저장 버퍼를 배치 단위로 비우는 백그라운드 루프"""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        batch = [await _write_buf.get()]
+        deadline = loop.time() + WRITE_FLUSH_INTERVAL
+        
+        # 최대 WRITE_BATCH_SIZE개 또는 WRITE_FLUSH_INTERVAL 동안 수집
+        while len(batch) < WRITE_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_write_buf.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        try:
+            embedding_start = time.perf_counter_ns()
+            await vector_service.aadd_documents(batch)
+            stats.embed_ms += (time.perf_counter_ns() - embedding_start) / 1_000_000
+        except Exception as e:
+            print(f"⚠️ 문서 일괄 저장 오류 ({len(batch)}개): {e}")
+        finally:
+            for _ in batch:
+                _write_buf.task_done()
 
 # Pydantic 모델들
 class ChatMessage(BaseModel):
     message: str
     user_id: Optional[str] = "default"
     session_id: Optional[str] = None
+    include_debug: Optional[bool] = None  # 단기 기억, 타이밍, 통계 포함 여부 (미지정 시 INCLUDE_TIMING, 기본 포함)
+    include_search_results: bool = True  # false면 search_id와 미리보기만 반환 (GET /search/{sid}, 단일 워커 전용)
 
 class ChatResponse(BaseModel):
     response: str
-    search_results: List[dict]
-    memory_content: str
-    timing: dict
-    stats: dict
+    search_results: Optional[List[dict]] = None  # include_search_results=true (기본)
+    search_id: Optional[str] = None              # include_search_results=false
+    top_result_preview: Optional[str] = None     # include_search_results=false
+    memory_content: Optional[str] = None         # include_debug=false면 생략
+    timing: Optional[dict] = None                # include_debug=false면 생략
+    stats: Optional[dict] = None                 # include_debug=false면 생략
     mlops_info: dict
 
 class HealthResponse(BaseModel):
@@ -61,6 +167,7 @@ class HealthResponse(BaseModel):
     vector_db_connected: bool
     document_count: int
     uptime: str
+    event_loop: str
     mlops_status: dict
 
 # 🚀 새로운 MLOps 관련 모델들
@@ -89,13 +196,56 @@ class MLOpsSettingsRequest(BaseModel):
     collection_enabled: Optional[bool] = None
     monitoring_enabled: Optional[bool] = None
 
+# 응답 직렬화기는 임포트 시점에 한 번만 생성 (첫 요청의 스키마 컴파일 비용 제거)
+_chat_adapter = TypeAdapter(ChatResponse)
+_health_adapter = TypeAdapter(HealthResponse)
+_mlops_status_adapter = TypeAdapter(MLOpsStatusResponse)
+_finetune_adapter = TypeAdapter(FinetuneResponse)
+
+def _json_response(adapter: TypeAdapter, model: BaseModel, exclude_none: bool = False) -> Response:
+    """미리 만든 TypeAdapter로 바로 직렬화 (FastAPI response_model 검증 생략)
+
+    exclude_none=True면 값이 None인 모델 필드(요청하지 않은 선택 필드)를 응답에서 뺍니다.
+    """
+    return Response(adapter.dump_json(model, exclude_none=exclude_none), media_type="application/json")
+
 # 시작 시간 기록
 start_time = time.time()
 
+# 응답 timestamp 문자열 (초 단위로 한 번만 포맷)
+_now_iso_cache = (0, "")
+
+def _now_iso() -> str:
+    """현재 시각 ISO 문자열 (같은 초 안의 요청은 캐시된 문자열 재사용)"""
+    global _now_iso_cache
+    second = int(time.time())
+    if second != _now_iso_cache[0]:
+        _now_iso_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _now_iso_cache[1]
+
+def _load_kanana_model() -> KananaModel:
+    """Kanana 모델 로딩"""
+    model = KananaModel(settings.get_model_config())
+    model.load_model()
+    return model
+
+# gunicorn --preload: 마스터 프로세스에서 한 번만 로딩한 뒤 fork (워커들이 가중치를 공유)
+# CUDA는 초기화 후 fork하면 워커에서 다시 초기화할 수 없으므로 CPU 디바이스일 때만 사전 로딩
+if settings.preload_model:
+    preloaded = KananaModel(settings.get_model_config())
+    if preloaded.device == "cpu":
+        print("📦 Kanana 모델 사전 로딩 (preload)...")
+        preloaded.load_model()
+        preloaded.share_memory()
+        kanana_model = preloaded
+    else:
+        print(f"⚠️ PRELOAD_MODEL은 CPU에서만 지원됩니다 (디바이스: {preloaded.device}). 워커에서 모델을 로딩합니다.")
+    del preloaded
+
 @app.on_event("startup")
 async def startup_event():
     """서버 시작 시 모델들 초기화"""
-    global kanana_model, vector_service, gpt_service, mlops_manager
+    global kanana_model, vector_service, gpt_service, semantic_cache, mlops_manager, _ready, _write_buf, _writer_task
     
     print("🚀 RAG Chat 백엔드 서버 (Advanced MLOps) 초기화 중...")
     
@@ -106,19 +256,27 @@ async def startup_event():
         exit(1)
     
     try:
-        # 1. Kanana 모델 로딩
-        print("📦 Kanana 모델 로딩...")
-        kanana_model = KananaModel(settings.get_model_config())
-        await asyncio.to_thread(kanana_model.load_model)
+        # 1. Kanana 모델 로딩 (preload 시 마스터에서 이미 로딩됨) + 워밍업
+        if kanana_model is None:
+            print("📦 Kanana 모델 로딩...")
+            kanana_model = await asyncio.to_thread(_load_kanana_model)
+        await asyncio.to_thread(kanana_model.warmup)
         
         # 2. 벡터 서비스 초기화
         print("🗄️ Vector 서비스 초기화...")
         vector_service = VectorService(kanana_model, settings.get_chroma_config())
         await asyncio.to_thread(vector_service.initialize)
+        await asyncio.to_thread(vector_service.warmup)
+        semantic_cache = SemanticCache(settings.get_semantic_cache_config())
+        _write_buf = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+        _writer_task = _schedule_background(_drain_writes())
         
         # 3. GPT 서비스 초기화
         print("🧠 GPT 서비스 초기화...")
         gpt_service = GPTService(settings.get_openai_config())
+        if not await gpt_service.validate_api_key():
+            print("⚠️ OpenAI API 키 검증 실패: 채팅 요청이 실패할 수 있습니다. (잠시 후 다시 확인)")
+        _ready = True
         
         # 🚀 4. 통합 MLOps 매니저 초기화
         print("🤖 통합 MLOps 매니저 초기화...")
@@ -144,21 +302,40 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """서버 종료 시 정리 작업"""
+    global _ready
     print("🛑 서버 종료 중...")
+    _ready = False  # 새 채팅 요청은 503으로 거절
+    
+    # 버퍼에 남은 문서 저장 후 저장 루프 종료, 나머지 백그라운드 작업 완료 대기
+    if _write_buf is not None:
+        await _write_buf.join()
+    if _writer_task is not None:
+        _writer_task.cancel()
+    if background_tasks_set:
+        await asyncio.gather(*background_tasks_set, return_exceptions=True)
+    
+    _mlops_executor.shutdown(wait=True)
     
     if mlops_manager:
         mlops_manager.shutdown()
     
+    if gpt_service:
+        await gpt_service.close()
+    
+    if vector_service:
+        vector_service.close()
+    
     print("✅ 정리 작업 완료")
 
-# 애플리케이션 종료 시 정리
+# 애플리케이션 종료 시 정리 (lifespan shutdown이 실행되지 않은 경우의 대비책, 이미 종료됐으면 no-op)
 atexit.register(lambda: mlops_manager.shutdown() if mlops_manager else None)
 
-@app.get("/health", response_model=HealthResponse)
+@app.get("/health", responses={200: {"model": HealthResponse}})
 async def health_check():
     """서버 상태 확인 (MLOps 포함)"""
-    uptime_seconds = time.time() - start_time
-    uptime_str = f"{int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m {int(uptime_seconds % 60)}s"
+    minutes, seconds = divmod(int(time.time() - start_time), 60)
+    hours, minutes = divmod(minutes, 60)
+    uptime_str = f"{hours}h {minutes}m {seconds}s"
     
     doc_count = 0
     vector_connected = False
@@ -174,149 +351,309 @@ async def health_check():
     mlops_status = {}
     if mlops_manager:
         try:
-            mlops_status = mlops_manager.get_status()
+            mlops_status = await asyncio.to_thread(mlops_manager.get_status)
         except Exception as e:
             mlops_status = {"error": str(e)}
     
-    return HealthResponse(
-        status="healthy" if kanana_model and vector_service and gpt_service else "initializing",
+    return _json_response(_health_adapter, HealthResponse.model_construct(
+        status="healthy" if _ready else "initializing",
         model_loaded=kanana_model is not None,
         vector_db_connected=vector_connected,
         document_count=doc_count,
         uptime=uptime_str,
+        event_loop=type(asyncio.get_running_loop()).__module__,  # uvloop 적용 여부 확인용
         mlops_status=mlops_status
-    )
+    ))
+
+def _log_chat_error(message: ChatMessage, e: Exception):
+    """채팅 처리 오류 이벤트 로깅"""
+    if mlops_manager:
+        mlops_manager._log_event("chat_error", {
+            "error": str(e),
+            "user_id": message.user_id,
+            "message_length": len(message.message)
+        }, f"채팅 처리 오류: {str(e)}")
+
+def _sse(payload: dict) -> bytes:
+    """Server-Sent Events 형식의 이벤트 한 개 직렬화"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+async def _prepare_chat(message: ChatMessage) -> dict:
+    """응답 생성 이전 단계: 쿼리 임베딩, 벡터 검색, 단기 기억, 캐시 조회"""
+    # 통계 업데이트
+    stats.queries += 1
+    
+    # 1. 쿼리 임베딩 (벡터 검색과 캐시 조회에 한 번만 계산)
+    search_start = time.perf_counter_ns()
+    query_embedding = await vector_service.aembed(message.message)
+    
+    # 2. 벡터 검색 시작 + 3. 단기 기억 가져오기 (검색과 동시에 진행)
+    search_task = asyncio.create_task(vector_service.asearch_similar(
+        message.message,
+        n_results=settings.search_default_results,
+        query_embedding=query_embedding
+    ))
+    memory_content = memory.view()
+    search_results = await search_task
+    search_ns = time.perf_counter_ns() - search_start
+    stats.search_ms += search_ns / 1_000_000
+    
+    # 캐시는 같은 검색 문맥에서 나온 응답만 재사용
+    # (단기 기억은 매 턴 바뀌므로 키에 넣으면 반복 질문이 적중하지 않음, 오래된 답은 TTL로 만료)
+    cache_key = None
+    cached_response = None
+    if semantic_cache.enabled:
+        cache_key = SemanticCache.context_key(*(result["document"] for result in search_results))
+        cached_response = semantic_cache.lookup(query_embedding, cache_key)
+    
+    return {
+        "query_embedding": query_embedding,
+        "cache_key": cache_key,
+        "cached_response": cached_response,
+        "search_results": search_results,
+        "memory_content": memory_content,
+        "search_ns": search_ns
+    }
+
+def _wants_debug(message: ChatMessage) -> bool:
+    """디버그 정보(단기 기억, 타이밍, 통계)를 응답에 포함할지 여부 (요청 값 우선, 없으면 서버 기본값)"""
+    if message.include_debug is not None:
+        return message.include_debug
+    return settings.include_timing
+
+def _chat_timing(total_ns: int, search_ns: int, gpt_ns: int) -> dict:
+    """단계별 소요 시간 (ms)"""
+    return {
+        "total": total_ns / 1_000_000,
+        "search": search_ns / 1_000_000,
+        "gpt": gpt_ns / 1_000_000,
+        "embedding": "background"
+    }
+
+async def _collect_conversation(message: ChatMessage, response: str, metadata: dict):
+    """MLOps 대화 수집 및 파인튜닝 트리거 확인 (백그라운드, 파일 I/O는 전용 스레드에서)"""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_mlops_executor, functools.partial(
+            mlops_manager.process_conversation,
+            user_message=message.message,
+            assistant_response=response,
+            user_id=message.user_id,
+            session_id=message.session_id,
+            metadata=metadata
+        ))
+    except Exception as e:
+        print(f"⚠️ MLOps 처리 오류: {e}")
+        mlops_manager._log_event("mlops_error", {
+            "error": str(e),
+            "user_id": message.user_id
+        }, f"MLOps 대화 처리 오류: {str(e)}")
+
+async def _finish_chat(message: ChatMessage, context: dict, response: str, gpt_ns: int, complete: bool = True) -> dict:
+    """응답 생성 이후 단계: 캐시 저장, MLOps 수집, 벡터 저장 예약, 메모리 업데이트
+    
+    complete=False(스트리밍 중 연결이 끊겨 일부만 생성된 응답)면 시맨틱 캐시에는 저장하지 않습니다.
+    """
+    stats.gpt_ms += gpt_ns / 1_000_000
+    cached = context["cached_response"] is not None
+    
+    if complete and not cached and context["cache_key"] is not None:
+        semantic_cache.insert(context["query_embedding"], response, context["cache_key"])
+    
+    # 🚀 5. MLOps 대화 수집 및 파인튜닝 트리거 확인 (응답을 막지 않도록 백그라운드 실행)
+    mlops_info = {"collection_enabled": False, "training_triggered": False}
+    if mlops_manager and mlops_manager.collector.enabled:
+        _schedule_background(_collect_conversation(message, response, {
+            "search_results_count": len(context["search_results"]),
+            "memory_length": len(context["memory_content"]),
+            "timing": {
+                "search_ms": context["search_ns"] / 1_000_000,
+                "gpt_ms": gpt_ns / 1_000_000
+            }
+        }))
+        # 실제 결과는 백그라운드에서 결정되므로 같은 키의 예상 값 반환 (scheduled=True)
+        mlops_info = {
+            "collection_enabled": True,
+            **mlops_manager.preview_conversation(message.message, response)
+        }
+    
+    # 6. 벡터화 및 저장 (저장 버퍼에 넣고 백그라운드에서 일괄 처리, 캐시 적중 시 생략)
+    if not cached:
+        await _write_buf.put(format_conversation(message.message, response))
+    
+    # 7. 메모리 업데이트
+    memory.append({"role": "user", "content": message.message})
+    memory.append({"role": "assistant", "content": response})
+    
+    return mlops_info
 
-@app.post("/chat", response_model=ChatResponse)
+# 응답 검증 비용을 피하기 위해 response_model 대신 문서용 스키마만 등록
+@app.post("/chat", responses={200: {"model": ChatResponse}})
 async def chat(message: ChatMessage):
     """채팅 메시지 처리 (MLOps 대화 수집 포함)"""
-    if not all([kanana_model, vector_service, gpt_service]):
+    if not _ready:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
-    query_start_time = time.time()
+    query_start = time.perf_counter_ns()
     
     try:
-        # 통계 업데이트
-        stats["total_queries"] += 1
-        
-        # 1. 벡터 검색
-        search_start = time.time()
-        search_results = await asyncio.to_thread(
-            vector_service.search_similar,
-            message.message,
-            n_results=settings.search_default_results
-        )
-        search_time = (time.time() - search_start) * 1000
-        stats["total_search_time"] += search_time
+        context = await _prepare_chat(message)
         
-        # 2. 단기 기억 가져오기
-        memory_content = memory.view()
+        # 4. GPT 응답 생성 (캐시 적중 시 생략)
+        gpt_start = time.perf_counter_ns()
+        if context["cached_response"] is not None:
+            response = context["cached_response"]
+        else:
+            response = await gpt_service.generate_response(
+                user_message=message.message,
+                search_results=context["search_results"],
+                memory_content=context["memory_content"]
+            )
+        gpt_end = time.perf_counter_ns()
         
-        # 3. GPT 응답 생성
-        gpt_start = time.time()
-        response = await gpt_service.generate_response(
-            user_message=message.message,
-            search_results=search_results,
-            memory_content=memory_content
-        )
-        gpt_time = (time.time() - gpt_start) * 1000
-        stats["total_gpt_time"] += gpt_time
+        mlops_info = await _finish_chat(message, context, response, gpt_end - gpt_start)
         
-        # 🚀 4. MLOps 대화 수집 및 파인튜닝 트리거 확인
-        mlops_info = {"collection_enabled": False, "training_triggered": False}
-        if mlops_manager:
-            try:
-                mlops_result = mlops_manager.process_conversation(
-                    user_message=message.message,
-                    assistant_response=response,
-                    user_id=message.user_id,
-                    session_id=message.session_id,
-                    metadata={
-                        "search_results_count": len(search_results),
-                        "memory_length": len(memory_content),
-                        "timing": {
-                            "search_ms": search_time,
-                            "gpt_ms": gpt_time
-                        }
-                    }
-                )
-                mlops_info = mlops_result
-            except Exception as e:
-                print(f"⚠️ MLOps 처리 오류: {e}")
-                mlops_info = {"error": str(e)}
-        
-        # 5. 벡터화 및 저장
-        embedding_start = time.time()
-        doc = f"USER : {message.message}<\\n>ASSISTANT : {response}"
-        await asyncio.to_thread(vector_service.add_document, doc)
-        embedding_time = (time.time() - embedding_start) * 1000
-        stats["total_embedding_time"] += embedding_time
-        
-        # 6. 메모리 업데이트
-        memory.append({"role": "user", "content": message.message})
-        memory.append({"role": "assistant", "content": response})
-        
-        # 타이밍 정보
-        total_time = (time.time() - query_start_time) * 1000
-        timing = {
-            "total": f"{total_time:.2f}ms",
-            "search": f"{search_time:.2f}ms",
-            "gpt": f"{gpt_time:.2f}ms",
-            "embedding": f"{embedding_time:.2f}ms"
-        }
+        if not _wants_debug(message):
+            return _json_response(_chat_adapter, ChatResponse.model_construct(
+                response=response,
+                **_search_summary(context["search_results"], message.include_search_results),
+                mlops_info=mlops_info
+            ), exclude_none=True)
         
-        # 평균 통계 계산
-        avg_stats = {}
-        if stats["total_queries"] > 0:
-            avg_stats = {
-                "total_queries": stats["total_queries"],
-                "avg_search": f"{stats['total_search_time'] / stats['total_queries']:.2f}ms",
-                "avg_gpt": f"{stats['total_gpt_time'] / stats['total_queries']:.2f}ms",
-                "avg_embedding": f"{stats['total_embedding_time'] / stats['total_queries']:.2f}ms"
-            }
+        # 기본 응답: 단기 기억 + 타이밍 정보 + 누적 질의 수 (평균은 /stats에서 조회)
+        timing = _chat_timing(time.perf_counter_ns() - query_start, context["search_ns"], gpt_end - gpt_start)
         
-        return ChatResponse(
+        return _json_response(_chat_adapter, ChatResponse.model_construct(
             response=response,
-            search_results=search_results,
-            memory_content=memory_content,
+            **_search_summary(context["search_results"], message.include_search_results),
+            memory_content=context["memory_content"],
             timing=timing,
-            stats=avg_stats,
+            stats={"total_queries": stats.queries},
             mlops_info=mlops_info
-        )
+        ), exclude_none=True)
         
     except Exception as e:
         # 🚀 오류 이벤트 로깅
-        if mlops_manager:
-            mlops_manager._log_event("chat_error", {
-                "error": str(e),
-                "user_id": message.user_id,
-                "message_length": len(message.message)
-            }, f"채팅 처리 오류: {str(e)}")
-        
+        _log_chat_error(message, e)
         raise HTTPException(status_code=500, detail=f"Chat processing error: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """채팅 메시지 스트리밍 처리 (GPT 토큰을 SSE로 즉시 전달)"""
+    if not _ready:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+    
+    query_start = time.perf_counter_ns()
+    
+    try:
+        context = await _prepare_chat(message)
+    except Exception as e:
+        _log_chat_error(message, e)
+        raise HTTPException(status_code=500, detail=f"Chat processing error: {str(e)}")
+    
+    async def event_stream():
+        gpt_start = time.perf_counter_ns()
+        chunks = []
+        finish_task = None
+        failed = False
+        try:
+            # 검색 결과 요약은 첫 토큰 이전에 먼저 전달
+            yield _sse(_search_summary(context["search_results"], message.include_search_results))
+            
+            if context["cached_response"] is not None:
+                chunks.append(context["cached_response"])
+                yield _sse({"delta": context["cached_response"]})
+            else:
+                async for delta in gpt_service.stream_response(
+                    user_message=message.message,
+                    search_results=context["search_results"],
+                    memory_content=context["memory_content"]
+                ):
+                    chunks.append(delta)
+                    yield _sse({"delta": delta})
+            gpt_ns = time.perf_counter_ns() - gpt_start
+            
+            # 후처리는 백그라운드 태스크로 실행하고 shield로 기다림 (기다리는 중 연결이 끊겨도 계속 진행)
+            response = "".join(chunks).strip()
+            finish_task = _schedule_background(_finish_chat(message, context, response, gpt_ns))
+            mlops_info = await asyncio.shield(finish_task)
+            
+            final_event = {"done": True, "response": response, "mlops_info": mlops_info}
+            if _wants_debug(message):
+                final_event["timing"] = _chat_timing(time.perf_counter_ns() - query_start, context["search_ns"], gpt_ns)
+                final_event["stats"] = {"total_queries": stats.queries}
+            yield _sse(final_event)
+        
+        except Exception as e:
+            failed = True
+            _log_chat_error(message, e)
+            yield _sse({"error": f"Chat processing error: {str(e)}"})
+        
+        finally:
+            # 클라이언트가 중간에 연결을 끊으면 받은 부분까지 저장/메모리에 반영 (오류로 끝난 응답은 저장하지 않음)
+            partial = "".join(chunks).strip()
+            if finish_task is None and not failed and partial:
+                _schedule_background(_finish_chat(
+                    message, context, partial, time.perf_counter_ns() - gpt_start, complete=False
+                ))
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/search/{sid}")
+async def get_search_results(sid: str):
+    """채팅 응답의 search_id로 전체 검색 결과 조회"""
+    search_results = _search_cache.get(sid)
+    if search_results is None:
+        raise HTTPException(status_code=404, detail="Search results not found or expired")
+    
+    _search_cache.move_to_end(sid)
+    return ORJSONResponse({"search_id": sid, "search_results": search_results})
+
 # 🚀 강화된 MLOps 엔드포인트들
 
-@app.get("/mlops/status", response_model=MLOpsStatusResponse)
+@app.get("/mlops/status", responses={200: {"model": MLOpsStatusResponse}})
 async def get_mlops_status():
     """통합 MLOps 상태 조회"""
     if not mlops_manager:
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        status = mlops_manager.get_status()
-        performance = mlops_manager.get_performance_metrics()
+        status, performance = await asyncio.gather(
+            asyncio.to_thread(mlops_manager.get_status),
+            asyncio.to_thread(mlops_manager.get_performance_metrics)
+        )
         
-        return MLOpsStatusResponse(
+        return _json_response(_mlops_status_adapter, MLOpsStatusResponse.model_construct(
             collector_stats=status["collector"],
             training_status=status["training"],
             models_info=status["models"],
             events_summary=status["events"],
             performance_metrics=performance
-        )
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"MLOps status error: {str(e)}")
 
+def _stream_conversations(first, conversations: Iterator, collector_stats: dict) -> Iterator[bytes]:
+    """수집된 대화를 JSON 조각으로 스트리밍 (동기 제너레이터라 파일 I/O는 스레드풀에서 실행)
+    
+    응답 상태(200)가 이미 전송된 뒤의 읽기 오류는 목록을 닫고 "error" 키로 알립니다.
+    """
+    yield b'{"conversations":['
+    error = None
+    if first is not None:
+        yield orjson.dumps(first, option=orjson.OPT_NON_STR_KEYS)
+        try:
+            for conv in conversations:
+                yield b"," + orjson.dumps(conv, option=orjson.OPT_NON_STR_KEYS)
+        except Exception as e:
+            print(f"❌ 대화 스트리밍 오류: {e}")
+            error = f"Conversations retrieval error: {str(e)}"
+    
+    tail = b'],"total_count":' + orjson.dumps(collector_stats["total_collected"]) + b',"stats":' + orjson.dumps(collector_stats)
+    if error is not None:
+        tail += b',"error":' + orjson.dumps(error)
+    yield tail + b"}"
+
 @app.get("/mlops/conversations")
 async def get_conversations(limit: Optional[int] = 50):
     """수집된 대화 목록 조회"""
@@ -324,79 +661,99 @@ async def get_conversations(limit: Optional[int] = 50):
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        conversations = mlops_manager.collector.get_collected_conversations(limit)
-        return {
-            "conversations": [conv.to_dict() for conv in conversations],
-            "total_count": mlops_manager.collector.stats["total_collected"],
-            "stats": mlops_manager.collector.get_stats()
-        }
+        # 첫 대화까지 미리 읽어 대기 중인 기록 flush와 초기 오류는 500으로 처리
+        # (통계는 flush 이후에 읽어 스트리밍되는 줄과 맞춤)
+        conversations = mlops_manager.collector.iter_collected_conversations(limit)
+        first = await asyncio.to_thread(next, conversations, None)
+        collector_stats = mlops_manager.collector.get_stats()
+        return StreamingResponse(
+            _stream_conversations(first, conversations, collector_stats),
+            media_type="application/json"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Conversations retrieval error: {str(e)}")
 
-@app.post("/mlops/finetune", response_model=FinetuneResponse)
+def _run_training(manager: MLOpsManager, force: bool, total_conversations: int):
+    """수동 파인튜닝 실행 (BackgroundTasks에서 스레드풀로 호출)
+    
+    자동 파인튜닝과 같이 성공하면 시작 정보를 포함한 training_completed 하나만 기록하고,
+    시작 이벤트(training_triggered)는 실패했을 때만 실패 이벤트 앞에 기록합니다.
+    """
+    trigger = {
+        "trigger_type": "manual",
+        "total_conversations": total_conversations,
+        "force": force,
+        "triggered_at": datetime.now().isoformat()
+    }
+    try:
+        result = manager.start_finetuning(force=force)
+        
+        if result["success"]:
+            manager.current_model_version = result["version"]
+            manager.last_training_count = total_conversations
+            
+            manager._log_event("training_completed", {
+                "version": result["version"],
+                "training_time": result["training_time"],
+                "training_samples": result["training_samples"],
+                **trigger
+            }, f"수동 파인튜닝 완료! 버전: {result['version']}")
+        else:
+            manager._log_training_triggered(trigger)
+            manager._log_event("training_failed", {
+                "error": result.get("error", "Unknown error during training"),
+                "trigger_type": "manual"
+            }, "수동 파인튜닝 실패")
+        
+    except Exception as e:
+        manager._log_training_triggered(trigger)
+        manager._log_event("training_failed", {
+            "error": str(e),
+            "trigger_type": "manual"
+        }, f"수동 파인튜닝 실패: {str(e)}")
+    finally:
+        manager.end_training()
+
+@app.post("/mlops/finetune", responses={200: {"model": FinetuneResponse}})
 async def trigger_finetuning(request: FinetuneRequest, background_tasks: BackgroundTasks):
     """수동 파인튜닝 트리거"""
     if not mlops_manager:
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
-    if mlops_manager.training_in_progress:
-        raise HTTPException(status_code=409, detail="Training already in progress")
-    
     try:
         # 수집된 대화 수 확인
         total_conversations = mlops_manager.collector.stats["total_collected"]
         
         if total_conversations == 0:
-            return FinetuneResponse(
+            return _json_response(_finetune_adapter, FinetuneResponse.model_construct(
                 success=False,
                 message="수집된 대화가 없습니다.",
                 training_data_count=0
-            )
+            ))
         
         if not request.force and total_conversations < mlops_manager.batch_size:
-            return FinetuneResponse(
+            return _json_response(_finetune_adapter, FinetuneResponse.model_construct(
                 success=False,
                 message=f"배치 크기({mlops_manager.batch_size})에 도달하지 않았습니다. force=true로 강제 실행 가능.",
                 training_data_count=total_conversations
-            )
+            ))
         
-        # 백그라운드에서 파인튜닝 실행
-        def run_training():
-            try:
-                mlops_manager._log_event("training_triggered", {
-                    "trigger_type": "manual",
-                    "total_conversations": total_conversations,
-                    "force": request.force
-                }, "수동 파인튜닝 트리거")
-                
-                result = mlops_manager.start_finetuning(force=request.force)
-                
-                if result["success"]:
-                    mlops_manager.current_model_version = result["version"]
-                    mlops_manager.last_training_count = total_conversations
-                    
-                    mlops_manager._log_event("training_completed", {
-                        "version": result["version"],
-                        "training_time": result["training_time"],
-                        "training_samples": result["training_samples"]
-                    }, f"수동 파인튜닝 완료! 버전: {result['version']}")
-                
-            except Exception as e:
-                mlops_manager._log_event("training_failed", {
-                    "error": str(e),
-                    "trigger_type": "manual"
-                }, f"수동 파인튜닝 실패: {str(e)}")
-        
-        # 백그라운드 태스크로 실행
-        background_tasks.add_task(run_training)
-        
-        return FinetuneResponse(
+        # 확인과 설정을 한 번에 처리해야 동시 요청이 둘 다 학습을 시작하지 않음
+        if not mlops_manager.try_begin_training():
+            raise HTTPException(status_code=409, detail="Training already in progress")
+        
+        # 백그라운드 태스크로 실행 (종료 시 실행 권한 해제)
+        background_tasks.add_task(_run_training, mlops_manager, request.force, total_conversations)
+        
+        return _json_response(_finetune_adapter, FinetuneResponse.model_construct(
             success=True,
             message="파인튜닝이 백그라운드에서 시작되었습니다.",
             training_data_count=total_conversations,
             estimated_time="약 5-10분"
-        )
+        ))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Finetuning error: {str(e)}")
 
@@ -408,7 +765,7 @@ async def clear_conversations(backup: bool = True):
     
     try:
         old_count = mlops_manager.collector.stats["total_collected"]
-        success = mlops_manager.collector.clear_conversations(backup_first=backup)
+        success = await asyncio.to_thread(mlops_manager.collector.clear_conversations, backup_first=backup)
         
         if success:
             mlops_manager._log_event("conversations_cleared", {
@@ -433,7 +790,7 @@ async def export_training_data():
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        dataset_path = mlops_manager.collector.export_for_finetuning()
+        dataset_path = await asyncio.to_thread(mlops_manager.collector.export_for_finetuning)
         
         if dataset_path:
             mlops_manager._log_event("dataset_exported", {
@@ -467,7 +824,7 @@ async def get_training_progress():
     current_count = mlops_manager.collector.stats["total_collected"]
     batch_size = mlops_manager.batch_size
     
-    return {
+    return ORJSONResponse({
         "current_conversations": current_count,
         "batch_size": batch_size,
         "progress_percentage": (current_count % batch_size) / batch_size * 100 if batch_size > 0 else 0,
@@ -476,7 +833,7 @@ async def get_training_progress():
         "auto_trigger_enabled": mlops_manager.auto_trigger,
         "current_version": mlops_manager.current_model_version,
         "last_training_count": mlops_manager.last_training_count
-    }
+    })
 
 @app.post("/mlops/settings")
 async def update_mlops_settings(settings_request: MLOpsSettingsRequest):
@@ -519,12 +876,12 @@ async def get_mlops_events(
     try:
         events = mlops_manager.get_events_log(event_type=event_type, limit=limit)
         
-        return {
+        return ORJSONResponse({
             "events": events,
             "total_count": len(mlops_manager.events_log),
             "filtered_count": len(events),
             "filter": event_type
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Events retrieval error: {str(e)}")
@@ -536,7 +893,7 @@ async def get_training_history():
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        history = mlops_manager.get_training_history()
+        history = await asyncio.to_thread(mlops_manager.get_training_history)
         
         return {
             "training_history": history,
@@ -554,7 +911,7 @@ async def get_model_versions():
         raise HTTPException(status_code=503, detail="Finetuner not available")
     
     try:
-        versions = mlops_manager.finetuner.get_model_versions()
+        versions = await asyncio.to_thread(mlops_manager.finetuner.get_model_versions)
         
         return {
             "model_versions": versions,
@@ -573,11 +930,11 @@ async def get_performance_metrics():
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        metrics = mlops_manager.get_performance_metrics()
+        metrics = await asyncio.to_thread(mlops_manager.get_performance_metrics)
         
         return {
             "performance_metrics": metrics,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
         
     except Exception as e:
@@ -590,7 +947,7 @@ async def cleanup_old_data(keep_days: int = 30):
         raise HTTPException(status_code=503, detail="MLOps manager not initialized")
     
     try:
-        result = mlops_manager.cleanup_old_data(keep_days=keep_days)
+        result = await asyncio.to_thread(mlops_manager.cleanup_old_data, keep_days=keep_days)
         
         return result
         
@@ -602,21 +959,22 @@ async def cleanup_old_data(keep_days: int = 30):
 @app.get("/memory")
 async def get_memory():
     """현재 메모리 상태 조회"""
-    return {
+    return ORJSONResponse({
         "messages": memory.messages,
-        "count": len(memory.messages),
+        "count": len(memory),
         "max_count": memory.max_count
-    }
+    })
 
 @app.delete("/memory")
 async def clear_memory():
     """메모리 초기화"""
+    previous_count = len(memory)
     memory.clear()
     
     # 🚀 이벤트 로깅
     if mlops_manager:
         mlops_manager._log_event("memory_cleared", {
-            "previous_count": len(memory.messages)
+            "previous_count": previous_count
         }, "대화 메모리가 초기화되었습니다.")
     
     return {"message": "Memory cleared successfully"}
@@ -624,32 +982,38 @@ async def clear_memory():
 @app.get("/stats")
 async def get_stats():
     """성능 통계 조회 (MLOps 포함)"""
+    raw_stats = stats.snapshot()
+    total_queries = raw_stats["total_queries"]
+    
+    # 평균은 숫자(ms)로 전달하고 표시 형식은 클라이언트에서 결정
     avg_stats = {}
-    if stats["total_queries"] > 0:
+    if total_queries > 0:
         avg_stats = {
-            "total_queries": stats["total_queries"],
-            "avg_search_time": f"{stats['total_search_time'] / stats['total_queries']:.2f}ms",
-            "avg_gpt_time": f"{stats['total_gpt_time'] / stats['total_queries']:.2f}ms",
-            "avg_embedding_time": f"{stats['total_embedding_time'] / stats['total_queries']:.2f}ms"
+            "total_queries": total_queries,
+            "avg_search_ms": raw_stats["total_search_time"] / total_queries,
+            "avg_gpt_ms": raw_stats["total_gpt_time"] / total_queries,
+            "avg_embedding_ms": raw_stats["total_embedding_time"] / total_queries
         }
     
     # 🚀 MLOps 통계 추가
     mlops_stats = {}
     if mlops_manager:
         try:
-            mlops_stats = mlops_manager.get_status()
+            mlops_stats = await asyncio.to_thread(mlops_manager.get_status)
         except Exception as e:
             mlops_stats = {"error": str(e)}
     
-    return {
+    return ORJSONResponse({
         "performance": {
-            "raw_stats": stats,
+            "raw_stats": raw_stats,
             "averages": avg_stats,
-            "document_count": vector_service.get_document_count() if vector_service else 0
+            "document_count": vector_service.get_document_count() if vector_service else 0,
+            "semantic_cache": semantic_cache.get_stats() if semantic_cache else {},
+            "embedding_batching": vector_service.encoder.get_stats() if vector_service else {}
         },
         "mlops": mlops_stats,
-        "timestamp": datetime.now().isoformat()
-    }
+        "timestamp": _now_iso()
+    })
 
 if __name__ == "__main__":
     print("🚀 RAG Chat 백엔드 서버 (Advanced MLOps) 시작!")
@@ -675,11 +1039,20 @@ if __name__ == "__main__":
     print("- 📈 이벤트 로깅 및 웹훅 알림")
     print("- ⚡ 백그라운드 파인튜닝")
     print("=" * 80)
+    if settings.workers > 1:
+        print("⚠️ WORKERS > 1: 단기 기억/캐시/MLOps 학습/ChromaDB가 워커마다 따로 동작합니다. WORKERS=1을 권장합니다.")
     
     uvicorn.run(
         "app:app",
         host=settings.host,
         port=settings.port,
         reload=settings.reload,
-        log_level=settings.log_level.lower()
+        workers=settings.workers,
+        log_level=settings.log_level.lower(),
+        # uvloop(libuv) 이벤트 루프 + httptools 파서 (uvloop은 Windows 미지원)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        access_log=settings.access_log,
+        server_header=False,
+        date_header=False
     )
\ No newline at end of file
@@ -1,14 +1,40 @@
 import os
-from pathlib import Path
-from typing import Optional, List
-from pydantic import Field
+import json
+import functools
+from types import MappingProxyType
+from typing import Optional, List, Mapping
+from pydantic import Field, PrivateAttr
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 # .env 파일 로드
-env_path = Path(__file__).parent.parent / ".env"
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
 load_dotenv(dotenv_path=env_path)
 
+def _freeze(config: dict) -> Mapping:
+    """중첩 딕셔너리까지 읽기 전용 뷰로 변환"""
+    return MappingProxyType({
+        key: _freeze(value) if isinstance(value, dict) else value
+        for key, value in config.items()
+    })
+
+def _memoized_config(method):
+    """설정 딕셔너리를 처음 한 번만 만들고 이후에는 같은 읽기 전용 객체를 반환"""
+    @functools.wraps(method)
+    def wrapper(self) -> Mapping:
+        cache = self._config_cache
+        if method.__name__ not in cache:
+            cache[method.__name__] = _freeze(method(self))
+        return cache[method.__name__]
+    return wrapper
+
+def _parse_list(value: str) -> List[str]:
+    """쉼표로 구분된 문자열을 리스트로 변환 (JSON 배열 형식도 허용)"""
+    value = value.strip()
+    if value.startswith("["):
+        return [str(item).strip() for item in json.loads(value)]
+    return [item.strip() for item in value.split(",") if item.strip()]
+
 class Settings(BaseSettings):
     """애플리케이션 설정 클래스 (MLOps 확장)"""
     
@@ -23,6 +49,10 @@ class Settings(BaseSettings):
     port: int = Field(default=8000, env="PORT")
     debug: bool = Field(default=True, env="DEBUG")
     reload: bool = Field(default=True, env="RELOAD")
+    workers: int = Field(default=1, env="WORKERS")  # reload=True일 때는 무시됨, 상태가 프로세스별이므로 1 권장
+    access_log: bool = Field(default=False, env="ACCESS_LOG")
+    preload_model: bool = Field(default=False, env="PRELOAD_MODEL")  # gunicorn --preload 시 마스터에서 모델 로딩 (CPU 디바이스만, CUDA는 무시)
+    include_timing: bool = Field(default=True, env="INCLUDE_TIMING")  # 요청에 include_debug가 없을 때 /chat 응답에 단기 기억/타이밍/통계 포함 (false면 생략)
     
     # === 모델 설정 ===
     kanana_model_name: str = Field(
@@ -35,6 +65,8 @@ class Settings(BaseSettings):
     )
     device: str = Field(default="auto", env="DEVICE")  # auto, cuda, cpu
     dtype: str = Field(default="bfloat16", env="MODEL_DTYPE")
+    compile_embeddings: bool = Field(default=False, env="COMPILE_EMBEDDINGS")  # CUDA에서 임베딩 레이어를 torch.compile (기본 모드, CUDA 그래프 없음)
+    embedding_quantization: bool = Field(default=False, env="EMBEDDING_QUANTIZATION")  # 임베딩 테이블을 int8로 양자화 (켜고 끌 때 재색인 필요)
     
     # === 데이터베이스 설정 ===
     chroma_data_path: str = Field(default="./data/chroma_data", env="CHROMA_DATA_PATH")
@@ -42,6 +74,11 @@ class Settings(BaseSettings):
         default="kanana-docs-optimized", 
         env="CHROMA_COLLECTION_NAME"
     )
+    # HNSW 인덱스 파라미터 (새 컬렉션을 만들 때만 적용, 기존 컬렉션은 생성 시 값 유지)
+    chroma_hnsw_space: str = Field(default="l2", env="CHROMA_HNSW_SPACE")  # l2(기존 컬렉션과 같은 기본값), cosine, ip (바꾸려면 새 컬렉션에 재색인)
+    chroma_hnsw_m: int = Field(default=32, env="CHROMA_HNSW_M")  # 노드당 연결 수 (클수록 재현율↑, 메모리↑)
+    chroma_hnsw_construction_ef: int = Field(default=200, env="CHROMA_HNSW_CONSTRUCTION_EF")
+    chroma_hnsw_search_ef: int = Field(default=0, env="CHROMA_HNSW_SEARCH_EF")  # 0이면 max(64, 4 * SEARCH_MAX_RESULTS)
     
     # === 메모리 설정 ===
     memory_max_count: int = Field(default=30, env="MEMORY_MAX_COUNT")
@@ -51,6 +88,7 @@ class Settings(BaseSettings):
     # === 검색 설정 ===
     search_default_results: int = Field(default=3, env="SEARCH_DEFAULT_RESULTS")
     search_max_results: int = Field(default=10, env="SEARCH_MAX_RESULTS")
+    search_rerank_factor: int = Field(default=1, env="SEARCH_RERANK_FACTOR")  # n_results의 몇 배를 후보로 가져와 코사인 재순위 (1=비활성화)
     
     # === 로깅 설정 ===
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
@@ -58,14 +96,27 @@ class Settings(BaseSettings):
     log_file_rotation: str = Field(default="10 MB", env="LOG_FILE_ROTATION")
     
     # === CORS 설정 ===
-    allowed_origins: List[str] = Field(
-        default=["http://localhost:3000", "http://127.0.0.1:3000"],
+    # List[str] 필드는 pydantic-settings가 환경 변수를 먼저 JSON으로 디코딩하려 하므로
+    # 원본 문자열로 받고 직접 분리 (allowed_origins 프로퍼티로 제공)
+    cors_origins: str = Field(
+        default="http://localhost:3000,http://127.0.0.1:3000",
         env="CORS_ORIGINS"
     )
     
     # === 성능 설정 ===
     max_concurrent_requests: int = Field(default=10, env="MAX_CONCURRENT_REQUESTS")
     request_timeout: int = Field(default=300, env="REQUEST_TIMEOUT")
+    embed_batch_size: int = Field(default=32, env="EMBED_BATCH_SIZE")  # 동적 배칭 최대 크기
+    embed_batch_wait_ms: float = Field(default=5.0, env="EMBED_BATCH_WAIT_MS")  # 배치 수집 대기 시간
+    embed_workers: int = Field(default=1, env="EMBED_WORKERS")  # 임베딩/검색 전용 스레드 수
+    vector_write_batch_size: int = Field(default=32, env="VECTOR_WRITE_BATCH_SIZE")  # 한 번에 저장할 최대 대화 문서 수
+    vector_write_interval_ms: float = Field(default=250.0, env="VECTOR_WRITE_INTERVAL_MS")  # 저장 배치 수집 대기 시간
+    
+    # === 시맨틱 캐시 설정 ===
+    semantic_cache_enabled: bool = Field(default=False, env="SEMANTIC_CACHE_ENABLED")  # 같은 검색 문맥의 유사 질문에 이전 응답 재사용 (기본 꺼짐)
+    semantic_cache_size: int = Field(default=1024, env="SEMANTIC_CACHE_SIZE")  # 최대 캐시 항목 수
+    semantic_cache_threshold: float = Field(default=0.97, env="SEMANTIC_CACHE_THRESHOLD")  # 코사인 유사도 임계값
+    semantic_cache_ttl: float = Field(default=3600.0, env="SEMANTIC_CACHE_TTL")  # 캐시 항목 유효 시간(초), 0이면 만료 없음
     
     # ================================
     # 🚀 새로운 MLOps 파인튜닝 설정
@@ -98,6 +149,9 @@ class Settings(BaseSettings):
     finetune_lora_r: int = Field(default=16, env="FINETUNE_LORA_R")
     finetune_lora_alpha: int = Field(default=32, env="FINETUNE_LORA_ALPHA")
     finetune_lora_dropout: float = Field(default=0.1, env="FINETUNE_LORA_DROPOUT")
+    finetune_quantize_base: bool = Field(default=True, env="FINETUNE_QUANTIZE_BASE")  # 베이스 모델 4bit NF4 로딩 (QLoRA)
+    finetune_map_num_proc: int = Field(default=0, env="FINETUNE_MAP_NUM_PROC")  # 토크나이징 프로세스 수 (0이면 서버 프로세스 안에서 실행)
+    finetune_dataloader_workers: int = Field(default=0, env="FINETUNE_DATALOADER_WORKERS")  # DataLoader 워커 프로세스 수 (0이면 메인 프로세스에서 로딩)
     
     # === 대화 수집 설정 ===
     conversation_collection_enabled: bool = Field(
@@ -110,24 +164,39 @@ class Settings(BaseSettings):
         default=True, 
         env="CONVERSATION_FILTER_SYSTEM"
     )  # 시스템 메시지 필터링
+    conversation_file_lock: bool = Field(default=True, env="CONVERSATION_FILE_LOCK")  # 기록 시 파일 락 (여러 워커 프로세스가 같은 파일에 쓸 때 필요)
     
     # === 모니터링 설정 ===
     finetune_monitoring_enabled: bool = Field(default=True, env="FINETUNE_MONITORING_ENABLED")
     finetune_webhook_url: Optional[str] = Field(default=None, env="FINETUNE_WEBHOOK_URL")  # 슬랙/디스코드 웹훅
+    finetune_events_log_max: int = Field(default=1000, env="FINETUNE_EVENTS_LOG_MAX")  # 메모리에 보관할 최대 이벤트 수
     
+    # .env는 모듈 상단의 load_dotenv()가 이미 os.environ에 올려두므로 env_file로 다시 파싱하지 않음
+    # 중첩 모델 필드가 없으므로 env_nested_delimiter 처리(환경 변수 전체 스캔)도 사용하지 않음
     model_config = {
-        "env_file": ".env",
-        "env_file_encoding": "utf-8",
         "case_sensitive": False,
         "protected_namespaces": ('settings_',),
-        "env_nested_delimiter": "__",
         "extra": "ignore"
     }
     
+    # get_*_config() 결과 캐시 (메서드 이름 → 읽기 전용 딕셔너리)
+    _config_cache: dict = PrivateAttr(default_factory=dict)
+    # 자주 쓰는 전체 경로는 초기화 시 한 번만 계산
+    _full_conversation_path: str = PrivateAttr(default="")
+    _full_dataset_path: str = PrivateAttr(default="")
+    _allowed_origins: List[str] = PrivateAttr(default_factory=list)
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._validate_settings()
-        self._create_directories()
+        self._allowed_origins = _parse_list(self.cors_origins)
+        self._full_conversation_path = os.path.join(self.finetune_data_path, self.finetune_conversations_file)
+        self._full_dataset_path = os.path.join(self.finetune_data_path, self.finetune_dataset_file)
+    
+    @property
+    def allowed_origins(self) -> List[str]:
+        """CORS 허용 origin 목록"""
+        return self._allowed_origins
     
     def _validate_settings(self):
         """설정 값 유효성 검사"""
@@ -141,6 +210,12 @@ class Settings(BaseSettings):
         if self.memory_max_count <= 0:
             raise ValueError("MEMORY_MAX_COUNT는 0보다 커야 합니다.")
         
+        if self.semantic_cache_size <= 0:
+            raise ValueError("SEMANTIC_CACHE_SIZE는 0보다 커야 합니다.")
+        
+        if self.semantic_cache_ttl < 0:
+            raise ValueError("SEMANTIC_CACHE_TTL은 0 이상이어야 합니다.")
+        
         # 🚀 MLOps 설정 검증
         if self.finetune_batch_size <= 0:
             raise ValueError("FINETUNE_BATCH_SIZE는 0보다 커야 합니다.")
@@ -151,8 +226,8 @@ class Settings(BaseSettings):
         if self.conversation_min_length >= self.conversation_max_length:
             raise ValueError("CONVERSATION_MIN_LENGTH는 MAX_LENGTH보다 작아야 합니다.")
     
-    def _create_directories(self):
-        """필요한 디렉터리 생성"""
+    def ensure_dirs(self):
+        """필요한 디렉터리 생성 (check_environment에서 호출)"""
         directories = [
             self.chroma_data_path,
             self.memory_save_path,
@@ -163,25 +238,40 @@ class Settings(BaseSettings):
         
         for directory in directories:
             if directory:
-                Path(directory).mkdir(parents=True, exist_ok=True)
+                os.makedirs(directory, exist_ok=True)
     
-    def get_model_config(self) -> dict:
+    @_memoized_config
+    def get_model_config(self) -> Mapping:
         """모델 설정 딕셔너리 반환"""
         return {
             "model_name": self.kanana_model_name,
             "finetuned_path": self.kanana_finetuned_path,
             "device": self.device,
-            "dtype": self.dtype
+            "dtype": self.dtype,
+            "compile_embeddings": self.compile_embeddings,
+            "embedding_quantization": self.embedding_quantization
         }
     
-    def get_chroma_config(self) -> dict:
+    @_memoized_config
+    def get_chroma_config(self) -> Mapping:
         """ChromaDB 설정 딕셔너리 반환"""
         return {
             "path": self.chroma_data_path,
-            "collection_name": self.chroma_collection_name
+            "collection_name": self.chroma_collection_name,
+            "embed_batch_size": self.embed_batch_size,
+            "embed_batch_wait_ms": self.embed_batch_wait_ms,
+            "embed_workers": self.embed_workers,
+            "rerank_factor": self.search_rerank_factor,
+            "hnsw": {
+                "space": self.chroma_hnsw_space,
+                "M": self.chroma_hnsw_m,
+                "ef_construction": self.chroma_hnsw_construction_ef,
+                "ef_search": self.chroma_hnsw_search_ef or max(64, 4 * self.search_max_results)
+            }
         }
     
-    def get_openai_config(self) -> dict:
+    @_memoized_config
+    def get_openai_config(self) -> Mapping:
         """OpenAI 설정 딕셔너리 반환"""
         return {
             "api_key": self.openai_api_key,
@@ -190,8 +280,19 @@ class Settings(BaseSettings):
             "max_tokens": self.openai_max_tokens
         }
     
+    @_memoized_config
+    def get_semantic_cache_config(self) -> Mapping:
+        """시맨틱 캐시 설정 딕셔너리 반환"""
+        return {
+            "enabled": self.semantic_cache_enabled,
+            "size": self.semantic_cache_size,
+            "threshold": self.semantic_cache_threshold,
+            "ttl": self.semantic_cache_ttl
+        }
+    
     # 🚀 새로운 MLOps 설정 메서드들
-    def get_finetune_config(self) -> dict:
+    @_memoized_config
+    def get_finetune_config(self) -> Mapping:
         """파인튜닝 설정 딕셔너리 반환"""
         return {
             "enabled": self.finetune_enabled,
@@ -203,73 +304,105 @@ class Settings(BaseSettings):
             "models_path": self.finetune_models_path,
             "backup_count": self.finetune_backup_count,
             "version_prefix": self.finetune_version_prefix,
+            "events_log_max": self.finetune_events_log_max,
             "hyperparameters": {
                 "epochs": self.finetune_epochs,
                 "learning_rate": self.finetune_learning_rate,
                 "lora_r": self.finetune_lora_r,
                 "lora_alpha": self.finetune_lora_alpha,
-                "lora_dropout": self.finetune_lora_dropout
+                "lora_dropout": self.finetune_lora_dropout,
+                "quantize_base": self.finetune_quantize_base,
+                "map_num_proc": self.finetune_map_num_proc,
+                "dataloader_workers": self.finetune_dataloader_workers
             }
         }
     
-    def get_conversation_config(self) -> dict:
+    @_memoized_config
+    def get_conversation_config(self) -> Mapping:
         """대화 수집 설정 딕셔너리 반환"""
         return {
             "enabled": self.conversation_collection_enabled,
             "min_length": self.conversation_min_length,
             "max_length": self.conversation_max_length,
             "filter_system": self.conversation_filter_system,
+            "file_lock": self.conversation_file_lock,
             "data_path": self.finetune_data_path,
             "file_name": self.finetune_conversations_file
         }
     
     def get_full_conversation_path(self) -> str:
         """대화 데이터 전체 경로 반환"""
-        return os.path.join(self.finetune_data_path, self.finetune_conversations_file)
+        return self._full_conversation_path
     
     def get_full_dataset_path(self) -> str:
         """학습 데이터셋 전체 경로 반환"""
-        return os.path.join(self.finetune_data_path, self.finetune_dataset_file)
+        return self._full_dataset_path
+    
+    def get_settings_summary(self) -> str:
+        """설정 요약 문자열 반환 (처음 한 번만 만들고 재사용)"""
+        summary = self._config_cache.get("settings_summary")
+        if summary is None:
+            summary = "\n".join([
+                "\n🔧 === 시스템 설정 ===",
+                f"🌐 서버: {self.host}:{self.port}",
+                f"🤖 모델: {self.kanana_model_name}",
+                f"🔥 디바이스: {self.device}",
+                f"🗄️ ChromaDB: {self.chroma_data_path}",
+                f"🧠 메모리: {self.memory_max_count}개 메시지",
+                f"🔍 검색: 기본 {self.search_default_results}개 결과",
+                f"⚡ 시맨틱 캐시: {'활성화' if self.semantic_cache_enabled else '비활성화'} ({self.semantic_cache_size}개, 임계값 {self.semantic_cache_threshold})",
+                f"📝 로그: {self.log_level} → {self.log_file_path}",
+                f"🌍 CORS: {', '.join(self.allowed_origins)}",
+                # 🚀 MLOps 설정 요약
+                "\n🚀 === MLOps 설정 ===",
+                f"🤖 파인튜닝: {'활성화' if self.finetune_enabled else '비활성화'}",
+                f"📊 배치 크기: {self.finetune_batch_size}개 대화",
+                f"⚡ 자동 트리거: {'ON' if self.finetune_auto_trigger else 'OFF'}",
+                f"📁 데이터 경로: {self.finetune_data_path}",
+                f"💾 모델 백업: {self.finetune_backup_count}개 보관",
+                f"📈 대화 수집: {'활성화' if self.conversation_collection_enabled else '비활성화'}",
+                f"📏 대화 길이: {self.conversation_min_length}~{self.conversation_max_length}자",
+                "🚀 ====================\n"
+            ])
+            self._config_cache["settings_summary"] = summary
+        return summary
     
     def print_settings_summary(self):
-        """설정 요약 출력 (MLOps 포함)"""
-        print("\n🔧 === 시스템 설정 ===")
-        print(f"🌐 서버: {self.host}:{self.port}")
-        print(f"🤖 모델: {self.kanana_model_name}")
-        print(f"🔥 디바이스: {self.device}")
-        print(f"🗄️ ChromaDB: {self.chroma_data_path}")
-        print(f"🧠 메모리: {self.memory_max_count}개 메시지")
-        print(f"🔍 검색: 기본 {self.search_default_results}개 결과")
-        print(f"📝 로그: {self.log_level} → {self.log_file_path}")
-        print(f"🌍 CORS: {', '.join(self.allowed_origins)}")
-        
-        # 🚀 MLOps 설정 요약
-        print("\n🚀 === MLOps 설정 ===")
-        print(f"🤖 파인튜닝: {'활성화' if self.finetune_enabled else '비활성화'}")
-        print(f"📊 배치 크기: {self.finetune_batch_size}개 대화")
-        print(f"⚡ 자동 트리거: {'ON' if self.finetune_auto_trigger else 'OFF'}")
-        print(f"📁 데이터 경로: {self.finetune_data_path}")
-        print(f"💾 모델 백업: {self.finetune_backup_count}개 보관")
-        print(f"📈 대화 수집: {'활성화' if self.conversation_collection_enabled else '비활성화'}")
-        print(f"📏 대화 길이: {self.conversation_min_length}~{self.conversation_max_length}자")
-        print("🚀 ====================\n")
+        """설정 요약 출력 (MLOps 포함, 한 번의 쓰기로 출력)"""
+        print(self.get_settings_summary())
 
-# 전역 설정 인스턴스
-settings = Settings()
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """설정 인스턴스 반환 (최초 호출 시 한 번만 생성 및 검증)"""
+    return Settings()
+
+def __getattr__(name: str):
+    """전역 설정 인스턴스(settings)는 처음 접근할 때 생성 (PEP 562)
+    
+    settings를 쓰지 않고 이 모듈만 import하는 경우 검증 비용이 들지 않습니다.
+    """
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 설정 로드 확인 함수
 def check_environment():
     """환경 설정 상태 확인 (MLOps 포함)"""
+    settings = get_settings()
     issues = []
+    lines = []  # 상태 메시지는 모아서 한 번에 출력
+    
+    # 필요한 디렉터리 생성
+    settings.ensure_dirs()
     
     # 기존 검증
     if not settings.openai_api_key:
         issues.append("❌ OPENAI_API_KEY가 설정되지 않았습니다.")
     else:
-        print("✅ OpenAI API 키 로드됨")
+        lines.append("✅ OpenAI API 키 로드됨")
     
     # 모델 경로 확인
-    if settings.kanana_finetuned_path and not Path(settings.kanana_finetuned_path).exists():
+    if settings.kanana_finetuned_path and not os.path.exists(settings.kanana_finetuned_path):
         issues.append(f"⚠️ 파인튜닝 모델 경로를 찾을 수 없습니다: {settings.kanana_finetuned_path}")
     
     # 🚀 MLOps 디렉터리 권한 확인
@@ -282,31 +415,31 @@ def check_environment():
     
     for path in mlops_paths:
         try:
-            Path(path).mkdir(parents=True, exist_ok=True)
-            test_file = Path(path) / "test_write"
-            test_file.touch()
-            test_file.unlink()
+            test_file = os.path.join(path, ".test_write")
+            fd = os.open(test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            os.close(fd)
+            os.unlink(test_file)
         except Exception as e:
             issues.append(f"❌ 디렉터리 쓰기 권한 없음: {path} ({e})")
     
     # 🚀 파인튜닝 설정 검증
     if settings.finetune_enabled:
-        print("✅ 파인튜닝 자동화 활성화됨")
+        lines.append("✅ 파인튜닝 자동화 활성화됨")
         if settings.finetune_auto_trigger:
-            print(f"✅ 자동 트리거: {settings.finetune_batch_size}개 대화마다 실행")
+            lines.append(f"✅ 자동 트리거: {settings.finetune_batch_size}개 대화마다 실행")
         else:
-            print("⚠️ 자동 트리거 비활성화됨 (수동 실행 필요)")
+            lines.append("⚠️ 자동 트리거 비활성화됨 (수동 실행 필요)")
     
     if settings.conversation_collection_enabled:
-        print("✅ 대화 수집 활성화됨")
-        print(f"📏 수집 조건: {settings.conversation_min_length}~{settings.conversation_max_length}자")
+        lines.append("✅ 대화 수집 활성화됨")
+        lines.append(f"📏 수집 조건: {settings.conversation_min_length}~{settings.conversation_max_length}자")
     
     if issues:
-        print("\n🚨 === 환경 설정 문제 ===")
-        for issue in issues:
-            print(issue)
-        print("🚨 ========================\n")
-        return False
+        lines.append("\n🚨 === 환경 설정 문제 ===")
+        lines.extend(issues)
+        lines.append("🚨 ========================\n")
     else:
-        print("✅ 모든 환경 설정이 올바릅니다!")
-        return True
\ No newline at end of file
+        lines.append("✅ 모든 환경 설정이 올바릅니다!")
+    
+    print("\n".join(lines))
+    return not issues
@@ -136,7 +136,8 @@ class RAGChatApp {
                 },
                 body: JSON.stringify({
                     message: message,
-                    user_id: 'web_user'
+                    user_id: 'web_user',
+                    include_debug: true // 타이밍/통계 표시용
                 })
             });
 
@@ -145,10 +146,12 @@ class RAGChatApp {
             }
 
             const data = await response.json();
+            // 검색 결과는 기본으로 응답에 포함, include_search_results=false일 때만 id로 조회
+            const searchResults = data.search_results ?? await this.fetchSearchResults(data.search_id);
             
             // 응답 메시지 추가
             this.addMessage(data.response, 'assistant', {
-                searchResults: data.search_results,
+                searchResults: searchResults,
                 timing: data.timing,
                 stats: data.stats,
                 mlopsInfo: data.mlops_info // 🆕 MLOps 정보 추가
@@ -174,6 +177,24 @@ class RAGChatApp {
         }
     }
 
+    async fetchSearchResults(searchId) {
+        if (!searchId) {
+            return [];
+        }
+
+        try {
+            const response = await fetch(`${this.apiUrl}/search/${searchId}`);
+            if (!response.ok) {
+                return [];
+            }
+            const data = await response.json();
+            return data.search_results;
+        } catch (error) {
+            console.error('검색 결과 조회 실패:', error);
+            return [];
+        }
+    }
+
     addMessage(content, role, metadata = {}) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${role}`;
@@ -207,7 +228,7 @@ class RAGChatApp {
         if (metadata.timing) {
             messageHTML += `
                 <div class="message-meta">
-                    ⏱️ 응답시간: ${metadata.timing.total} | 검색: ${metadata.timing.search} | GPT: ${metadata.timing.gpt}
+                    ⏱️ 응답시간: ${metadata.timing.total.toFixed(2)}ms | 검색: ${metadata.timing.search.toFixed(2)}ms | GPT: ${metadata.timing.gpt.toFixed(2)}ms
                 </div>
             `;
         }
@@ -299,9 +320,9 @@ class RAGChatApp {
     }
 
     updateStats(stats, timing) {
+        // 평균 응답 시간은 /stats 폴링에서 갱신
         if (stats) {
             this.queryCount.textContent = stats.total_queries || 0;
-            this.avgResponse.textContent = stats.avg_gpt || '-';
         }
     }
 
@@ -408,7 +429,8 @@ class RAGChatApp {
                 
                 if (stats.performance && stats.performance.averages) {
                     this.queryCount.textContent = stats.performance.averages.total_queries || 0;
-                    this.avgResponse.textContent = stats.performance.averages.avg_gpt_time || '-';
+                    const avgGpt = stats.performance.averages.avg_gpt_ms;
+                    this.avgResponse.textContent = avgGpt !== undefined ? `${avgGpt.toFixed(2)}ms` : '-';
                 }
                 
                 if (stats.performance) {
@@ -1,10 +1,41 @@
+import os
 import torch
 import time
-import base64
+import binascii
+import threading
 import numpy as np
+from collections import OrderedDict
+from typing import List
 from transformers import AutoModelForCausalLM, AutoTokenizer
 from peft import PeftModel
 
+EMBED_CACHE_SIZE = 4096  # 최근 임베딩 결과(float32 리스트) 보관 개수
+EMBED_CACHE_MAX_TEXT = 2048  # 이보다 긴 텍스트는 캐시하지 않음 (문서 저장용 긴 텍스트가 캐시를 밀어내지 않도록)
+PINNED_IDS_MIN = 4096  # 고정 메모리 ID 버퍼 최소 크기 (토큰 수)
+
+# 채팅 템플릿에 쓰이는 특수 토큰
+SPECIAL_TOKENS = ["<|begin_of_text|>", "<|start_header_id|>", "<|end_header_id|>", "<|eot_id|>"]
+
+class QuantizedEmbedding(torch.nn.Module):
+    """행(토큰)별 스케일을 갖는 int8 임베딩 테이블
+    
+    임베딩 조회는 메모리 대역폭에 묶여 있으므로 bfloat16 대비 절반 크기인 int8 테이블에서
+    읽고 출력 dtype으로 되돌립니다. 평균 풀링 임베딩은 양자화 오차에 둔감하지만
+    원래 테이블로 만든 벡터와 섞이면 안 되므로 VectorService가 컬렉션별로 모드를 확인합니다.
+    """
+    
+    def __init__(self, weight: torch.Tensor, dtype: torch.dtype):
+        super().__init__()
+        with torch.no_grad():
+            weight = weight.detach().to(torch.float32)
+            scale = (weight.abs().amax(dim=1, keepdim=True) / 127).clamp(min=1e-8)
+            self.register_buffer("weight_q", (weight / scale).round().to(torch.int8))
+            self.register_buffer("scale", scale.to(dtype))
+        self.dtype = dtype
+    
+    def forward(self, ids: torch.Tensor) -> torch.Tensor:
+        return self.weight_q[ids].to(self.dtype) * self.scale[ids]
+
 class KananaModel:
     """Kanana 모델 관리 클래스"""
     
@@ -18,6 +49,10 @@ class KananaModel:
         self.model_name = config.get("model_name", "kakaocorp/kanana-1.5-2.1b-instruct-2505")
         self.finetuned_path = config.get("finetuned_path", "./kanana-vector-restoration")
         self.dtype_str = config.get("dtype", "bfloat16")
+        self.compile_embeddings = config.get("compile_embeddings", False)
+        self.embedding_quantization = config.get("embedding_quantization", False)
+        # 저장된 벡터와 같은 방식으로 임베딩하는지 확인하기 위한 모드 (컬렉션 메타데이터에 기록)
+        self.embedding_mode = "int8" if self.embedding_quantization else "full"
         
         # dtype 설정
         if self.dtype_str == "bfloat16":
@@ -32,6 +67,21 @@ class KananaModel:
         self.model = None
         self.embedding_layer = None
         
+        # 토큰 ID 전송용 고정 메모리 버퍼 (임베딩 스레드마다 따로 보관)
+        self._pinned_local = threading.local()
+        
+        # 특수 토큰 ID 텐서 (모델 로딩 후 계산)
+        self._special_idx = {}
+        self._special_id_tensor = None
+        
+        # embed_sentence()의 고정 템플릿 임베딩 (모델 로딩 후 계산)
+        self._sentence_prefix = None
+        self._sentence_suffix = None
+        
+        # 같은 텍스트의 반복 임베딩 방지 (임베딩 스레드풀에서 동시에 접근하므로 락 사용)
+        self._embed_cache = OrderedDict()
+        self._embed_cache_lock = threading.Lock()
+        
         print(f"🔥 디바이스: {self.device}, 데이터 타입: {self.dtype_str}")
     
     def load_model(self):
@@ -42,30 +92,42 @@ class KananaModel:
         try:
             # 1. 토크나이저 로딩
             print("📝 토크나이저 로딩...")
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.tokenizer = self._from_pretrained(AutoTokenizer, self.model_name)
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
             
             # 2. 베이스 모델 로딩
             print("🧠 베이스 모델 로딩...")
-            self.base_model = AutoModelForCausalLM.from_pretrained(
+            self.base_model = self._from_pretrained(
+                AutoModelForCausalLM,
                 self.model_name,
                 torch_dtype=self.dtype,
                 trust_remote_code=True
             ).eval().to(self.device)
             
             # 3. 파인튜닝된 모델 로딩 (있는 경우)
-            try:
-                print("🎯 파인튜닝된 모델 로딩...")
-                self.model = PeftModel.from_pretrained(self.base_model, self.finetuned_path)
-                print("✅ 파인튜닝된 모델 로딩 성공")
-            except Exception as e:
-                print(f"⚠️ 파인튜닝된 모델 로딩 실패: {e}")
-                print("📦 베이스 모델로 진행...")
+            if self._adapter_missing():
+                print(f"📦 파인튜닝된 모델이 없습니다 ({self.finetuned_path}). 베이스 모델로 진행...")
                 self.model = self.base_model
+            else:
+                try:
+                    print("🎯 파인튜닝된 모델 로딩...")
+                    self.model = PeftModel.from_pretrained(self.base_model, self.finetuned_path)
+                    print("✅ 파인튜닝된 모델 로딩 성공")
+                except Exception as e:
+                    print(f"⚠️ 파인튜닝된 모델 로딩 실패: {e}")
+                    print("📦 베이스 모델로 진행...")
+                    self.model = self.base_model
             
-            # 4. 임베딩 레이어 설정
+            # 4. 임베딩 레이어 설정 (이전 모델의 임베딩 캐시는 무효화)
             self.embedding_layer = self.model.get_input_embeddings()
+            if self.embedding_quantization:
+                self.embedding_layer = self._quantize_input_embeddings()
+            if self.compile_embeddings:
+                self._compile_embedding_layer()
+            self.clear_embed_cache()
+            self._prepare_special_tokens()
+            self._build_sentence_template()
             
             load_time = time.time() - start_time
             print(f"✅ Kanana 모델 로딩 완료: {load_time:.2f}초")
@@ -74,62 +136,250 @@ class KananaModel:
             print(f"❌ 모델 로딩 실패: {e}")
             raise e
     
+    @staticmethod
+    def _from_pretrained(loader, name: str, **kwargs):
+        """로컬 캐시를 먼저 사용하고, 없을 때만 허브에서 다운로드
+        
+        캐시가 있으면 허브 버전 확인(HEAD 요청) 없이 바로 로딩되므로 네트워크가 느린 환경에서
+        기동 시간이 크게 줄어듭니다.
+        """
+        try:
+            return loader.from_pretrained(name, local_files_only=True, **kwargs)
+        except (OSError, ValueError):
+            print(f"🌐 로컬 캐시에 없음, 허브에서 다운로드: {name}")
+            return loader.from_pretrained(name, **kwargs)
+    
+    def _adapter_missing(self) -> bool:
+        """파인튜닝 어댑터 경로가 로컬 경로인데 디렉터리가 없는지 확인 (허브 ID는 그대로 시도)"""
+        if not self.finetuned_path:
+            return True
+        is_local_path = self.finetuned_path.startswith((".", os.sep)) or os.path.isabs(self.finetuned_path)
+        return is_local_path and not os.path.isdir(self.finetuned_path)
+    
+    def _quantize_input_embeddings(self) -> QuantizedEmbedding:
+        """입력 임베딩을 int8 테이블로 교체하고 원래 테이블을 해제
+        
+        생성(generate)도 같은 int8 임베딩을 사용하므로 메모리에는 int8 테이블만 남습니다.
+        출력층(lm_head)과 가중치를 공유하는 모델은 원래 테이블을 해제할 수 없어 그대로 둡니다.
+        """
+        original = self.model.get_input_embeddings()
+        quantized = QuantizedEmbedding(original.weight, self.dtype)
+        
+        output = self.model.get_output_embeddings()
+        if output is not None and output.weight is original.weight:
+            print("🗜️ 임베딩 테이블 int8 양자화 적용 (출력층과 공유된 원래 테이블은 유지)")
+            return quantized
+        
+        self.model.set_input_embeddings(quantized)
+        del original
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+        print("🗜️ 임베딩 테이블 int8 양자화 적용 (원래 테이블 해제)")
+        return quantized
+    
+    def _compile_embedding_layer(self):
+        """임베딩 레이어를 torch.compile로 컴파일 (CUDA 전용, 실패 시 원래 레이어 유지)
+        
+        조회와 dtype 변환/스케일 곱(int8 양자화 시)을 하나의 커널로 합칩니다.
+        CUDA 그래프(reduce-overhead)는 입력 길이마다 그래프를 따로 기록해 메모리가 계속 늘고,
+        재생 결과가 다음 재생에 덮어써져 여러 임베딩 스레드에서 안전하지 않으므로 기본 모드를 사용합니다.
+        실제 컴파일은 첫 호출(warmup) 시점에 일어납니다.
+        """
+        if self.device != "cuda":
+            print("⚠️ 임베딩 컴파일은 CUDA에서만 지원됩니다. 건너뜁니다.")
+            return
+        
+        try:
+            self.embedding_layer = torch.compile(self.embedding_layer, dynamic=True)
+            print("⚙️ 임베딩 레이어 torch.compile 적용 (dynamic, CUDA 그래프 없음)")
+        except Exception as e:
+            print(f"⚠️ 임베딩 레이어 컴파일 실패, 기본 레이어 사용: {e}")
+    
+    def warmup(self, lengths=(16, 64, 256)):
+        """대표 길이로 임베딩을 미리 실행 (첫 요청의 커널 초기화/메모리 할당 비용 제거)"""
+        start_time = time.time()
+        for length in lengths:
+            self.embed("x " * length)
+        print(f"🔥 임베딩 워밍업 완료: {time.time() - start_time:.2f}초 (길이: {', '.join(map(str, lengths))})")
+    
+    def share_memory(self):
+        """모델 가중치를 공유 메모리로 이동 (fork된 워커 프로세스들이 같은 페이지를 참조)"""
+        if self.device != "cpu":
+            print("⚠️ 공유 메모리는 CPU 모델에서만 지원됩니다. (CUDA 초기화 후 fork 불가)")
+            return
+        
+        self.model.share_memory()
+        print("🔗 모델 가중치를 공유 메모리로 이동했습니다.")
+    
+    def _ids_to_device(self, ids: torch.Tensor) -> torch.Tensor:
+        """토크나이저 출력(CPU 텐서)을 디바이스로 복사
+        
+        CUDA에서는 스레드별 고정(pinned) 메모리 버퍼를 거쳐 비동기로 복사합니다.
+        버퍼를 다시 쓰기 전에 이전 복사 완료 이벤트를 기다리므로 복사 중인 값을 덮어쓰지 않습니다.
+        """
+        if self.device != "cuda":
+            return ids
+        
+        local = self._pinned_local
+        buffer = getattr(local, "buffer", None)
+        event = getattr(local, "event", None)
+        if event is not None:
+            event.synchronize()
+        
+        if buffer is None or buffer.numel() < ids.numel():
+            buffer = torch.empty(max(ids.numel(), PINNED_IDS_MIN), dtype=ids.dtype, pin_memory=True)
+            local.buffer = buffer
+        
+        staged = buffer[:ids.numel()].view(ids.shape)
+        staged.copy_(ids)
+        result = staged.to(self.device, non_blocking=True)
+        
+        local.event = torch.cuda.Event()
+        local.event.record()
+        return result
+    
+    @torch.inference_mode()
     def embed_optimized(self, text: str):
         """bfloat16을 유지하는 최적화된 임베딩 함수"""
         if not self.tokenizer or not self.embedding_layer:
             raise RuntimeError("모델이 로딩되지 않았습니다.")
         
-        ids = self.tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"].to(self.device)
+        ids = self._ids_to_device(self.tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"])
         vectors = self.embedding_layer(ids).squeeze(0)
-        result_bfloat16 = vectors.mean(dim=0).detach()  # bfloat16 유지
+        # 합산은 float32로 하고 결과만 모델 dtype으로 되돌림 (embed_batch와 같은 값, 빈 텍스트는 0 벡터)
+        result_bfloat16 = (vectors.float().sum(dim=0) / max(vectors.shape[0], 1)).to(vectors.dtype).detach()
         return result_bfloat16
     
-    def embed(self, text: str):
-        """기존 호환성을 위한 float32 함수 (ChromaDB 검색용)"""
-        bfloat16_result = self.embed_optimized(text)
-        float32_list = self.bfloat16_to_float32_list(bfloat16_result)
-        return float32_list
+    def embed(self, text: str) -> np.ndarray:
+        """float32 임베딩 (ChromaDB 검색/시맨틱 캐시용, 최근 결과는 캐시에서 반환)"""
+        cacheable = len(text) <= EMBED_CACHE_MAX_TEXT
+        if cacheable:
+            with self._embed_cache_lock:
+                cached = self._embed_cache.get(text)
+                if cached is not None:
+                    self._embed_cache.move_to_end(text)
+                    return cached
+        
+        embedding = self.bfloat16_to_float32_array(self.embed_optimized(text))
+        
+        if cacheable:
+            embedding = self._cache_embedding(text, embedding)
+        return embedding
+    
+    def embed_batch(self, texts: List[str]) -> torch.Tensor:
+        """여러 텍스트를 한 번에 토크나이즈/임베딩 (패딩 토큰을 제외한 평균, bfloat16 유지)
+        
+        embed()/embed_many()가 같은 캐시를 공유하므로 embed_optimized()와 같은 방식
+        (float32 합산 후 모델 dtype으로 변환, 빈 텍스트는 0 벡터)으로 계산합니다.
+        """
+        if not self.tokenizer or not self.embedding_layer:
+            raise RuntimeError("모델이 로딩되지 않았습니다.")
+        
+        encoded = self.tokenizer(texts, padding=True, return_tensors="pt", add_special_tokens=False)
+        # input_ids와 attention_mask를 하나로 묶어 한 번에 복사
+        ids, mask = self._ids_to_device(torch.stack([encoded["input_ids"], encoded["attention_mask"]])).unbind(0)
+        mask = mask.unsqueeze(-1)
+        
+        with torch.inference_mode():
+            vectors = self.embedding_layer(ids)
+            mask = mask.to(torch.float32)
+            summed = (vectors.float() * mask).sum(dim=1)
+            return (summed / mask.sum(dim=1).clamp(min=1)).to(vectors.dtype)
+    
+    def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """embed()의 배치 버전 (캐시에 없는 텍스트만 한 번에 임베딩)"""
+        results = [None] * len(texts)
+        missing = []
+        with self._embed_cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._embed_cache.get(text)
+                if cached is not None:
+                    self._embed_cache.move_to_end(text)
+                    results[i] = cached
+                else:
+                    missing.append(i)
+        
+        if missing:
+            embeddings = self.bfloat16_to_float32_array(self.embed_batch([texts[i] for i in missing]))
+            for i, embedding in zip(missing, embeddings):
+                if len(texts[i]) <= EMBED_CACHE_MAX_TEXT:
+                    embedding = self._cache_embedding(texts[i], embedding)
+                results[i] = embedding
+        
+        return results
+    
+    def _cache_embedding(self, text: str, embedding: np.ndarray) -> np.ndarray:
+        """임베딩 결과를 캐시에 저장하고 저장된 배열 반환 (가장 오래 사용되지 않은 항목부터 제거)
+        
+        배치 결과의 행(view)이 배치 전체 버퍼를 붙잡지 않도록 복사하고,
+        여러 호출자가 같은 배열을 공유하므로 읽기 전용으로 저장합니다.
+        """
+        embedding = embedding.copy()
+        embedding.flags.writeable = False
+        with self._embed_cache_lock:
+            self._embed_cache[text] = embedding
+            self._embed_cache.move_to_end(text)
+            if len(self._embed_cache) > EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+        return embedding
     
+    def clear_embed_cache(self):
+        """임베딩 캐시 초기화"""
+        with self._embed_cache_lock:
+            self._embed_cache.clear()
+    
+    @torch.inference_mode()
     def embed_text(self, text: str):
         """텍스트 임베딩"""
-        ids = self.tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"].to(self.device)
+        ids = self._ids_to_device(self.tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"])
         result = self.embedding_layer(ids)
         return result
     
+    def _prepare_special_tokens(self):
+        """채팅 템플릿 특수 토큰 ID를 한 번만 조회해 디바이스 텐서로 올려둠"""
+        ids = self.tokenizer.convert_tokens_to_ids(SPECIAL_TOKENS)
+        self._special_idx = {token: i for i, token in enumerate(SPECIAL_TOKENS)}
+        self._special_id_tensor = torch.tensor([ids], device=self.device)
+    
+    @torch.inference_mode()
     def embed_token(self, token: str):
-        """토큰 임베딩"""
+        """토큰 임베딩 (특수 토큰은 미리 올려둔 ID 텐서를 슬라이스해 사용)"""
+        idx = self._special_idx.get(token)
+        if idx is not None:
+            return self.embedding_layer(self._special_id_tensor[:, idx:idx + 1])
+        
         token_id = self.tokenizer.convert_tokens_to_ids(token)
         result = self.embedding_layer(torch.tensor([[token_id]]).to(self.device))
         return result
     
+    def _build_sentence_template(self):
+        """embed_sentence()의 고정 채팅 템플릿 부분을 미리 임베딩"""
+        with torch.inference_mode():
+            prefix = torch.cat([
+                self.embed_token("<|begin_of_text|>"),
+                self.embed_token("<|start_header_id|>"), self.embed_text("system"), self.embed_token("<|end_header_id|>"),
+                self.embed_text("당신은 문장을 그대로 읽어주는 친절한 AI 비서입니다."), self.embed_token("<|eot_id|>"),
+                self.embed_token("<|start_header_id|>"), self.embed_text("user"), self.embed_token("<|end_header_id|>")
+            ], dim=1)
+            suffix = torch.cat([
+                self.embed_text("이 문장을 최대한 원본과 똑같이 읽어주세요."), self.embed_token("<|eot_id|>"),
+                self.embed_token("<|start_header_id|>"), self.embed_text("assistant"), self.embed_token("<|end_header_id|>")
+            ], dim=1)
+        
+        self._sentence_prefix = prefix
+        self._sentence_suffix = suffix
+    
+    @torch.inference_mode()
     def embed_sentence(self, sentence_text: str):
-        """문장 전체 임베딩 (채팅 형식)"""
-        bos               = self.embed_token("<|begin_of_text|>")
-        sys_head          = self.embed_token("<|start_header_id|>")
-        sys_role          = self.embed_text("system")
-        sys_tail          = self.embed_token("<|end_header_id|>")
-        sys_content       = self.embed_text("당신은 문장을 그대로 읽어주는 친절한 AI 비서입니다.")
-        sys_eot           = self.embed_token("<|eot_id|>")
-        user_head         = self.embed_token("<|start_header_id|>")
-        user_role         = self.embed_text("user")
-        user_tail         = self.embed_token("<|end_header_id|>")
-        sentence_embed    = self.embed_text(sentence_text)
-        suffix_embed      = self.embed_text("이 문장을 최대한 원본과 똑같이 읽어주세요.")
-        user_eot          = self.embed_token("<|eot_id|>")
-        asst_head         = self.embed_token("<|start_header_id|>")
-        asst_role         = self.embed_text("assistant")
-        asst_tail         = self.embed_token("<|end_header_id|>")
-        
-        result = torch.cat([
-            bos,
-            sys_head, sys_role, sys_tail,
-            sys_content, sys_eot,
-            user_head, user_role, user_tail,
-            sentence_embed, suffix_embed, user_eot,
-            asst_head, asst_role, asst_tail
-        ], dim=1)
+        """문장 전체 임베딩 (채팅 형식, 고정 템플릿은 미리 계산된 값 사용)"""
+        if self._sentence_prefix is None:
+            self._build_sentence_template()
         
-        return result
+        return torch.cat([
+            self._sentence_prefix,
+            self.embed_text(sentence_text),
+            self._sentence_suffix
+        ], dim=1)
     
     def generate_text(self, input_text: str, max_new_tokens: int = 100):
         """텍스트 생성"""
@@ -138,7 +388,7 @@ class KananaModel:
         
         inputs = self.tokenizer(input_text, return_tensors="pt").to(self.device)
         
-        with torch.no_grad():
+        with torch.inference_mode():
             outputs = self.model.generate(
                 **inputs,
                 max_new_tokens=max_new_tokens,
@@ -163,18 +413,26 @@ class KananaModel:
         if tensor.dtype != torch.bfloat16:
             tensor = tensor.to(torch.bfloat16)
         
-        bytes_data = tensor.cpu().numpy().tobytes()
-        return base64.b64encode(bytes_data).decode('ascii')
+        # numpy에는 bfloat16이 없으므로 같은 크기의 int16으로 재해석해 리틀 엔디언 원시 바이트를 얻음 (복사 없음)
+        # ChromaDB 메타데이터는 문자열만 허용하므로 base64 유지 (binascii가 base64 모듈보다 빠름)
+        bytes_data = tensor.detach().contiguous().view(torch.int16).cpu().numpy().astype('<i2', copy=False).tobytes()
+        return binascii.b2a_base64(bytes_data, newline=False).decode('ascii')
     
     @staticmethod
     def deserialize_bfloat16_vector(encoded_str, shape):
         """ChromaDB에서 가져온 문자열을 bfloat16 텐서로 복원"""
-        bytes_data = base64.b64decode(encoded_str.encode('ascii'))
-        numpy_array = np.frombuffer(bytes_data, dtype=np.uint16)
+        bytes_data = binascii.a2b_base64(encoded_str)
+        # 리틀 엔디언으로 저장되어 있으므로 그대로 재해석 (빅 엔디언 호스트에서만 변환 복사 발생)
+        numpy_array = np.frombuffer(bytes_data, dtype='<i2').astype(np.int16, copy=False)
         
-        tensor = torch.from_numpy(numpy_array.view(np.dtype('>u2'))).view(torch.bfloat16)
+        tensor = torch.from_numpy(numpy_array).view(torch.bfloat16)
         return tensor.reshape(shape)
     
+    @staticmethod
+    def bfloat16_to_float32_array(tensor) -> np.ndarray:
+        """bfloat16 텐서를 float32 numpy 배열로 변환 (파이썬 float 객체를 만들지 않음)"""
+        return tensor.to(torch.float32).cpu().numpy()
+    
     @staticmethod
     def bfloat16_to_float32_list(tensor):
         """bfloat16 텐서를 ChromaDB 검색용 float32 리스트로 변환"""
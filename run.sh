@@ -0,0 +1,19 @@
+#!/bin/bash
+# gunicorn 실행: 마스터 프로세스에서 모델을 한 번 로딩(--preload, CPU 디바이스만)한 뒤 워커를 fork
+# 단기 기억, 시맨틱/검색 결과 캐시, MLOps 자동 학습, ChromaDB 클라이언트는 프로세스마다 따로 있으므로
+# 기본은 워커 1개 (여러 워커는 같은 모델을 동시에 학습하거나 같은 ChromaDB 디렉터리를 동시에 열게 됨)
+WORKERS=${WORKERS:-1}
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-8000}
+
+if [ "$WORKERS" -gt 1 ]; then
+    echo "⚠️ WORKERS=$WORKERS: 워커마다 상태가 분리됩니다 (단기 기억/캐시/파인튜닝/ChromaDB). WORKERS=1을 권장합니다."
+fi
+
+(cd frontend && python -m http.server 3000) &
+
+PRELOAD_MODEL=true exec gunicorn app:app \
+    -k uvicorn.workers.UvicornWorker \
+    -w "$WORKERS" \
+    -b "$HOST:$PORT" \
+    --preload
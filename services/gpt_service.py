@@ -1,6 +1,24 @@
 import os
-from openai import OpenAI
-from typing import List, Dict, Any
+import time
+from openai import AsyncOpenAI
+from typing import List, Dict, Any, AsyncIterator
+
+MODELS_CACHE_TTL = 3600.0  # 모델 목록은 거의 바뀌지 않으므로 1시간 캐시
+API_KEY_INVALID_TTL = 60.0  # 검증 실패(네트워크 오류 포함)는 잠시만 캐시하고 다시 확인
+
+# RAG 프롬프트 (검색 결과/단기 기억/유저 입력만 호출마다 채움)
+PROMPT_TEMPLATE = """당신은 유저의 맥락을 이해하고, 과거 대화 및 특징을 기반으로 지능적인 답변을 생성하는 AI 비서입니다.
+
+[검색 결과]
+{search}
+
+[단기 기억]
+{memory}
+
+--- 유저가 입력한 메시지에 응답하세요:
+유저입력 : {user}
+너 : 
+"""
 
 class GPTService:
     """GPT API 관리 서비스"""
@@ -15,103 +33,159 @@ class GPTService:
         if not self.api_key:
             raise ValueError("OpenAI API 키가 설정되지 않았습니다.")
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = AsyncOpenAI(api_key=self.api_key)
         
         # 시스템 프롬프트
         self.system_prompt = {
             "role": "system",
             "content": "당신은 친절하고 정확한 AI 비서입니다. 가능한 한 자세하고 명확하게 답변해주세요."
         }
+        self._base_messages = [self.system_prompt]
+        
+        # API 키 검증/모델 목록 캐시
+        self._api_key_valid = None
+        self._api_key_checked_at = 0.0
+        self._models_cache = None
+        self._models_cache_time = 0.0
         
         print(f"🧠 GPT 서비스 초기화 완료! (모델: {self.model})")
     
-    async def generate_response(
+    def _build_messages(
         self,
         user_message: str,
         search_results: List[Dict[str, Any]] = None,
-        memory_content: str = "",
-        model: str = None,
-        temperature: float = None
-    ) -> str:
-        """GPT를 사용해 응답 생성"""
-        
-        # 매개변수 기본값 설정
-        model = model or self.model
-        temperature = temperature if temperature is not None else self.temperature
+        memory_content: str = ""
+    ) -> List[Dict[str, str]]:
+        """GPT API 호출용 메시지 구성"""
         
         # 검색 결과 포맷팅
         search_text = ""
         if search_results:
-            search_text = "\n".join([
+            search_text = "\n".join(
                 f"[score: {result['score']:.4f}] {result['document']}"
                 for result in search_results
-            ])
+            )
         
         # 프롬프트 구성
-        prompt = f"""당신은 유저의 맥락을 이해하고, 과거 대화 및 특징을 기반으로 지능적인 답변을 생성하는 AI 비서입니다.
-
-[검색 결과]
-{search_text if search_text else "❌ 검색 결과 없음"}
-
-[단기 기억]
-{memory_content if memory_content else "❌ 없음"}
-
---- 유저가 입력한 메시지에 응답하세요:
-유저입력 : {user_message}
-너 : 
-"""
+        prompt = PROMPT_TEMPLATE.format(
+            search=search_text or "❌ 검색 결과 없음",
+            memory=memory_content or "❌ 없음",
+            user=user_message
+        )
         
-        # GPT API 호출용 메시지 구성
-        messages = [
-            self.system_prompt,
-            {"role": "user", "content": prompt}
-        ]
+        return self._base_messages + [{"role": "user", "content": prompt}]
+    
+    async def stream_response(
+        self,
+        user_message: str,
+        search_results: List[Dict[str, Any]] = None,
+        memory_content: str = "",
+        model: str = None,
+        temperature: float = None
+    ) -> AsyncIterator[str]:
+        """GPT 응답을 토큰 단위로 스트리밍"""
         
+        # 매개변수 기본값 설정
+        model = model or self.model
+        temperature = temperature if temperature is not None else self.temperature
+        
+        messages = self._build_messages(user_message, search_results, memory_content)
+        
+        stream = None
         try:
-            # GPT API 호출
-            response = self.client.chat.completions.create(
+            # GPT API 스트리밍 호출
+            stream = await self.client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=self.max_tokens,
                 top_p=1.0,
                 frequency_penalty=0.0,
-                presence_penalty=0.0
+                presence_penalty=0.0,
+                stream=True
             )
             
-            reply = response.choices[0].message.content.strip()
-            return reply
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
             
         except Exception as e:
             error_msg = f"GPT API 오류: {str(e)}"
             print(f"❌ {error_msg}")
-            return f"죄송합니다. 현재 응답을 생성할 수 없습니다. ({error_msg})"
+            yield f"죄송합니다. 현재 응답을 생성할 수 없습니다. ({error_msg})"
+        
+        finally:
+            # 클라이언트가 중간에 연결을 끊어도 OpenAI 스트림 연결은 바로 반환
+            if stream is not None:
+                await stream.response.aclose()
     
-    def get_available_models(self) -> List[str]:
-        """사용 가능한 모델 목록 반환"""
+    async def generate_response(
+        self,
+        user_message: str,
+        search_results: List[Dict[str, Any]] = None,
+        memory_content: str = "",
+        model: str = None,
+        temperature: float = None
+    ) -> str:
+        """GPT를 사용해 응답 생성 (스트림을 끝까지 받아 합침)"""
+        chunks = [
+            chunk async for chunk in self.stream_response(
+                user_message,
+                search_results=search_results,
+                memory_content=memory_content,
+                model=model,
+                temperature=temperature
+            )
+        ]
+        return "".join(chunks).strip()
+    
+    async def get_available_models(self) -> List[str]:
+        """사용 가능한 모델 목록 반환 (MODELS_CACHE_TTL 동안 캐시)"""
+        now = time.monotonic()
+        if self._models_cache is not None and now - self._models_cache_time < MODELS_CACHE_TTL:
+            return self._models_cache
+        
         try:
-            models = self.client.models.list()
-            return [model.id for model in models.data if "gpt" in model.id.lower()]
+            models = await self.client.models.list()
+            self._models_cache = [model.id for model in models.data if "gpt" in model.id.lower()]
+            self._models_cache_time = now
+            self._api_key_valid = True  # 목록 조회 성공 = 유효한 키
+            return self._models_cache
         except Exception as e:
             print(f"❌ 모델 목록 조회 실패: {e}")
             return ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"]  # 기본 모델들
     
-    def validate_api_key(self) -> bool:
-        """API 키 유효성 검사"""
+    async def validate_api_key(self) -> bool:
+        """API 키 유효성 검사 (성공은 계속 재사용, 실패는 API_KEY_INVALID_TTL 후 다시 요청)"""
+        now = time.monotonic()
+        if self._api_key_valid or (
+            self._api_key_valid is False and now - self._api_key_checked_at < API_KEY_INVALID_TTL
+        ):
+            return self._api_key_valid
+        
         try:
             # 간단한 요청으로 API 키 검증
-            self.client.models.list()
-            return True
+            await self.client.models.list()
+            self._api_key_valid = True
         except Exception as e:
             print(f"❌ API 키 검증 실패: {e}")
-            return False
+            self._api_key_valid = False
+        self._api_key_checked_at = now
+        return self._api_key_valid
     
-    def get_service_info(self) -> Dict[str, Any]:
+    async def get_service_info(self) -> Dict[str, Any]:
         """서비스 정보 반환"""
+        # 모델 목록 조회가 성공하면 키 검증 결과도 채워지므로 순서대로 호출 (models.list() 중복 요청 방지)
+        available_models = await self.get_available_models()
+        api_key_valid = await self.validate_api_key()
         return {
             "status": "initialized",
-            "api_key_valid": self.validate_api_key(),
-            "available_models": self.get_available_models(),
+            "api_key_valid": api_key_valid,
+            "available_models": available_models,
             "default_model": "gpt-4o-mini",
             "system_prompt": self.system_prompt["content"]
-        }
\ No newline at end of file
+        }
+    
+    async def close(self):
+        """HTTP 클라이언트 정리"""
+        await self.client.close()
@@ -1,7 +1,41 @@
 import os
+import asyncio
+import functools
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from chromadb import PersistentClient
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
+import uuid
+import numpy as np
+from operator import itemgetter
+
+from utils.batching_encoder import BatchingEncoder
+
+try:
+    import simsimd  # 선택 의존성: 검색 재순위 거리 계산 가속
+except ImportError:
+    simsimd = None
+
+HASH_LOOKUP_BATCH = 100  # 중복 검사 시 한 번의 where 필터에 넣는 내용 해시 수
+DEFAULT_SPACE = "l2"  # hnsw:space가 없는 컬렉션의 ChromaDB 기본 거리 함수
+SIMSIMD_METRICS = {"l2": "sqeuclidean", "cosine": "cosine"}  # ChromaDB 거리 정의와 같은 simsimd 커널
+
+def _legacy_id_timestamp(doc_id: str) -> int:
+    """created_ts가 없는 이전 문서는 ID("doc-1736123456.789")에서 생성 시각(ns) 추출"""
+    try:
+        return int(float(doc_id.split("-", 1)[1]) * 1_000_000_000)
+    except (IndexError, ValueError):
+        return 0
+
+def _content_hash(document: str) -> str:
+    """중복 문서 판별용 내용 해시 (64bit blake2b, 16자리 hex)"""
+    return hashlib.blake2b(document.encode("utf-8"), digest_size=8).hexdigest()
+
+def _to_chroma(embedding) -> List[float]:
+    """ChromaDB 0.4.x는 임베딩을 파이썬 리스트로만 받으므로 호출 직전에만 변환"""
+    return embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
 
 class VectorService:
     """벡터 검색 및 저장 서비스"""
@@ -12,6 +46,39 @@ class VectorService:
         self.collection_name = config.get("collection_name", "kanana-docs-optimized")
         self.client = None
         self.collection = None
+        # 문서 수 캐시 (count()는 매번 SQLite COUNT(*)를 실행하므로 추가/삭제 시 직접 갱신)
+        self._doc_count = 0
+        # 내용 해시 → 문서 ID (같은 문서를 다시 저장할 때 임베딩/저장을 건너뜀, 조회한 해시만 채워짐)
+        self._doc_hashes: Dict[str, str] = {}
+        self._state_lock = threading.Lock()
+        self.rerank_factor = max(1, config.get("rerank_factor", 1))  # 1이면 재순위 없이 ChromaDB 결과 그대로 사용
+        
+        # 새 컬렉션 생성 시 사용할 HNSW 파라미터 (기본값 M=16, search_ef=10은 재현율이 낮음)
+        hnsw = config.get("hnsw", {})
+        self.hnsw_metadata = {
+            "hnsw:space": hnsw.get("space", DEFAULT_SPACE),
+            "hnsw:M": hnsw.get("M", 32),
+            "hnsw:construction_ef": hnsw.get("ef_construction", 200),
+            "hnsw:search_ef": hnsw.get("ef_search", 64)
+        }
+        # 임베딩 방식(int8 양자화 여부)이 다른 벡터가 한 컬렉션에 섞이지 않도록 메타데이터에 기록
+        self.embedding_mode = getattr(kanana_model, "embedding_mode", "full")
+        self.collection_metadata = {**self.hnsw_metadata, "embedding_mode": self.embedding_mode}
+        
+        # 전용 스레드 풀 (기본 스레드풀과 경쟁하지 않도록 임베딩/검색과 저장을 분리)
+        self._embed_executor = ThreadPoolExecutor(
+            max_workers=config.get("embed_workers", 1),
+            thread_name_prefix="embed"
+        )
+        self._write_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vecwrite")
+        
+        # 동시 요청의 임베딩을 모아 한 번에 계산
+        self.encoder = BatchingEncoder(
+            self._embed_batch,
+            self._embed_executor,
+            max_batch_size=config.get("embed_batch_size", 32),
+            max_wait_ms=config.get("embed_batch_wait_ms", 5.0)
+        )
         
     def initialize(self):
         """ChromaDB 초기화"""
@@ -21,53 +88,125 @@ class VectorService:
         os.makedirs(self.chroma_path, exist_ok=True)
         
         self.client = PersistentClient(path=self.chroma_path)
-        self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        try:
+            # 기존 컬렉션은 생성 당시의 HNSW 설정(거리 함수 포함)을 그대로 사용
+            self.collection = self.client.get_collection(name=self.collection_name)
+        except ValueError:
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
+            print(f"🧭 HNSW 설정: {self.hnsw_metadata}")
         
-        # 기존 문서 수 확인
-        doc_count = self.collection.count()
+        # 기존 문서 수 확인 (이후에는 캐시된 값 사용)
+        self._doc_count = self.collection.count()
+        self._check_embedding_mode()
         
-        print(f"📚 기존 저장된 문서 수: {doc_count}개")
+        print(f"📚 기존 저장된 문서 수: {self._doc_count}개")
         print(f"🗄️ ChromaDB 경로: {self.chroma_path}")
         print(f"📦 컬렉션 이름: {self.collection_name}")
         print("✅ ChromaDB 초기화 완료!")
     
-    def search_similar(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """유사 문서 검색 (시간순 정렬)"""
+    @property
+    def space(self) -> str:
+        """컬렉션이 실제로 사용하는 거리 함수 (score는 항상 이 정의의 거리)"""
+        return (self.collection.metadata or {}).get("hnsw:space", DEFAULT_SPACE)
+    
+    def _check_embedding_mode(self):
+        """컬렉션에 저장된 벡터의 임베딩 방식이 현재 모델과 같은지 확인
+        
+        모드가 기록되지 않은 이전 컬렉션은 양자화 전(full)으로 간주합니다.
+        비어 있는 컬렉션은 현재 모드로 다시 만들고, 문서가 있으면 재색인을 요구합니다.
+        """
+        stored_mode = (self.collection.metadata or {}).get("embedding_mode", "full")
+        if stored_mode == self.embedding_mode:
+            return
+        
+        if self._doc_count == 0:
+            self.client.delete_collection(name=self.collection_name)
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
+            print(f"🧭 빈 컬렉션을 임베딩 모드 '{self.embedding_mode}'로 다시 생성")
+            return
+        
+        raise RuntimeError(
+            f"컬렉션 '{self.collection_name}'은 임베딩 모드 '{stored_mode}'로 저장되었습니다 "
+            f"(현재 '{self.embedding_mode}'). EMBEDDING_QUANTIZATION 설정을 되돌리거나 "
+            f"다른 CHROMA_COLLECTION_NAME으로 재색인하세요."
+        )
+    
+    def warmup(self):
+        """더미 검색으로 HNSW 인덱스를 메모리에 올려둠 (첫 검색 지연 제거)"""
+        if not self.collection or self._doc_count == 0:
+            return
+        
+        start_time = time.time()
+        self.search_similar("warmup", n_results=1, include_metadata=False)
+        print(f"🔥 벡터 검색 워밍업 완료: {time.time() - start_time:.2f}초")
+    
+    def search_similar(
+        self,
+        query: str,
+        n_results: int = 3,
+        query_embedding: Optional[np.ndarray] = None,
+        include_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        """유사 문서 검색 (시간순 정렬, include_metadata=False면 메타데이터 없이 유사도 순)"""
         if not self.collection:
             raise RuntimeError("VectorService가 초기화되지 않았습니다.")
         
-        # 쿼리 임베딩
-        query_embedding = self.kanana_model.embed(query)
+        # 쿼리 임베딩 (미리 계산된 값이 있으면 재사용)
+        if query_embedding is None:
+            query_embedding = self.kanana_model.embed(query)
+        
+        # 검색 실행 (ID도 함께 가져오기, 재순위 시 후보를 더 많이 가져옴)
+        # 필요한 컬럼만 요청 (요청하지 않은 컬럼은 ChromaDB가 읽지도 직렬화하지도 않음)
+        rerank = self.rerank_factor > 1
+        include = ["documents", "distances"]
+        if include_metadata:
+            include.append("metadatas")
+        if rerank:
+            include.append("embeddings")
         
-        # 검색 실행 (ID도 함께 가져오기)
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            include=["documents", "distances", "metadatas"]
+            query_embeddings=[_to_chroma(query_embedding)],
+            n_results=n_results * self.rerank_factor if rerank else n_results,
+            include=include
         )
         
+        documents = results["documents"][0]
+        distances = results["distances"][0]
+        metadatas = results["metadatas"][0] if include_metadata else [None] * len(documents)
+        ids = results["ids"][0]
+        
+        # 후보들을 컬렉션과 같은 거리 함수로 다시 정렬해 상위 n_results개만 사용
+        if rerank and documents:
+            order, distances = self._rerank(query_embedding, results["embeddings"][0], n_results, self.space)
+            documents = [documents[i] for i in order]
+            metadatas = [metadatas[i] for i in order]
+            ids = [ids[i] for i in order]
+        
         # 결과 포맷팅
         formatted_results = []
-        if results["documents"][0]:
-            for i, (doc, score, metadata) in enumerate(zip(
-                results["documents"][0],
-                results["distances"][0],
-                results.get("metadatas", [[{}] * len(results["documents"][0])])[0]
-            )):
-                # ID에서 타임스탬프 추출: "doc-1736123456.789" -> 1736123456.789
-                doc_id = results["ids"][0][i] if "ids" in results else f"doc-{time.time()}"
-                timestamp = float(doc_id.split("-")[1]) if "-" in doc_id else time.time()
-                
-                formatted_results.append({
-                    "document": doc,
-                    "score": float(score),
-                    "metadata": metadata or {},
-                    "rank": i + 1,
-                    "timestamp": timestamp
-                })
-        
-        # 🎯 시간순 정렬 (오래된 것부터)
-        formatted_results.sort(key=lambda x: x["timestamp"])
+        for i, (doc, score, metadata) in enumerate(zip(documents, distances, metadatas)):
+            metadata = metadata or {}
+            timestamp = metadata.get("created_ts")
+            if timestamp is None:
+                timestamp = _legacy_id_timestamp(ids[i])
+            
+            formatted_results.append({
+                "document": doc,
+                "score": float(score),
+                "metadata": metadata,
+                "rank": i + 1,
+                "timestamp": timestamp
+            })
+        
+        # 🎯 시간순 정렬 (오래된 것부터, 생성 시각은 메타데이터에 있으므로 가져온 경우에만)
+        if include_metadata:
+            formatted_results.sort(key=itemgetter("timestamp"))
         
         # timestamp는 내부 용도이므로 제거
         for result in formatted_results:
@@ -75,49 +214,225 @@ class VectorService:
         
         return formatted_results
     
-    def add_document(self, document: str, metadata: Dict[str, Any] = None) -> str:
-        """문서 추가"""
+    @staticmethod
+    def _rerank(query_embedding, candidate_embeddings, n_results: int, space: str = DEFAULT_SPACE):
+        """후보 임베딩을 정렬해 (상위 인덱스, 거리) 반환 (simsimd가 있으면 SIMD 커널 사용)
+        
+        거리는 ChromaDB와 같은 정의로 계산하므로 재순위 여부와 관계없이 score의 의미가 같습니다.
+        (l2: 제곱 유클리드 거리, cosine: 1 - 코사인 유사도, ip: 1 - 내적)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        candidates = np.ascontiguousarray(candidate_embeddings, dtype=np.float32)
+        
+        metric = SIMSIMD_METRICS.get(space) if simsimd is not None else None
+        if metric is not None:
+            distances = np.asarray(simsimd.cdist(query[np.newaxis], candidates, metric=metric))[0]
+        elif space == "cosine":
+            norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(query)
+            distances = 1.0 - (candidates @ query) / np.maximum(norms, 1e-12)
+        elif space == "ip":
+            distances = 1.0 - candidates @ query
+        else:
+            diff = candidates - query
+            distances = np.einsum("ij,ij->i", diff, diff)
+        
+        order = np.argsort(distances)[:n_results].tolist()
+        return order, [float(distances[i]) for i in order]
+    
+    def add_document(
+        self,
+        document: str,
+        metadata: Dict[str, Any] = None,
+        embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """문서 추가 (이미 저장된 문서면 기존 ID 반환)"""
+        embeddings = [embedding] if embedding is not None else None
+        return self.add_documents([document], [metadata], embeddings)[0]
+    
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[List[np.ndarray]] = None
+    ) -> List[str]:
+        """여러 문서를 한 번의 ChromaDB 호출로 추가 (중복 문서는 건너뛰고 기존 ID 반환)"""
         if not self.collection:
             raise RuntimeError("VectorService가 초기화되지 않았습니다.")
         
-        # 벡터 생성
-        vec_bfloat16 = self.kanana_model.embed_optimized(document)
-        vec_float32 = self.kanana_model.bfloat16_to_float32_list(vec_bfloat16)
+        if not documents:
+            return []
         
-        # 메타데이터 준비
-        if metadata is None:
-            metadata = {}
+        # 이미 저장됐거나 배치 안에서 반복된 문서는 임베딩 전에 제외
+        all_hashes = [_content_hash(document) for document in documents]
+        keep = self._new_document_indices(all_hashes)
+        if len(keep) < len(documents):
+            print(f"♻️ 중복 문서 건너뜀: {len(documents) - len(keep)}개")
+            if not keep:
+                return self._ids_for(all_hashes)
+            documents = [documents[i] for i in keep]
+            if metadatas is not None:
+                metadatas = [metadatas[i] for i in keep]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in keep]
+        hashes = [all_hashes[i] for i in keep]
         
-        # 메모리 사용량 계산
-        vector_memory_bfloat16 = vec_bfloat16.numel() * 2  # bfloat16
-        vector_memory_float32 = len(vec_float32) * 4  # float32
+        # 벡터 생성 (미리 계산된 값이 있으면 재사용)
+        if embeddings is None:
+            embeddings = self._embed_batch(documents)
         
-        metadata.update({
-            "vector_type": "bfloat16_optimized",
-            "original_dtype": "bfloat16", 
-            "memory_saved_kb": f"{(vector_memory_float32 - vector_memory_bfloat16)/1024:.2f}",
-            "doc_length": len(document)
-        })
+        # 메타데이터 준비
+        if metadatas is None:
+            metadatas = [None] * len(documents)
+        metadatas = [dict(metadata or {}) for metadata in metadatas]
         
-        # 🎯 시간 기반 ID 생성
-        doc_id = f"doc-{time.time()}"
+        # ChromaDB 0.4의 HNSW 인덱스는 float32 벡터만 저장하므로, 모델 출력(bfloat16)은 기록용으로만 남김
+        # 생성 시각은 정수 나노초로 메타데이터에 저장 (같은 배치 안에서는 1ns씩 증가시켜 순서 유지)
+        now_ns = time.time_ns()
+        for i, (document, metadata, content_hash) in enumerate(zip(documents, metadatas, hashes)):
+            metadata.update({
+                "vector_type": "bfloat16_optimized",
+                "original_dtype": "bfloat16",
+                "doc_length": len(document),
+                "created_ts": now_ns + i,
+                "content_hash": content_hash
+            })
+        
+        # 🎯 ID는 시각과 무관한 UUID (동시 저장 시에도 충돌 없음)
+        doc_ids = [f"doc-{uuid.uuid4().hex}" for _ in documents]
         
         # ChromaDB에 저장
         self.collection.add(
-            documents=[document],
-            embeddings=[vec_float32],
-            ids=[doc_id],
-            metadatas=[metadata]
+            documents=documents,
+            embeddings=[_to_chroma(embedding) for embedding in embeddings],
+            ids=doc_ids,
+            metadatas=metadatas
         )
+        with self._state_lock:
+            self._doc_count += len(doc_ids)
+            self._doc_hashes.update(zip(hashes, doc_ids))
+        
+        print(f"💾 문서 저장: {len(doc_ids)}개 ({doc_ids[0]} ~ {doc_ids[-1]})")
+        return self._ids_for(all_hashes)
+    
+    def _new_document_indices(self, hashes: List[str]) -> List[int]:
+        """아직 저장되지 않은 문서의 인덱스 반환 (배치 안에서 반복되면 첫 번째만)"""
+        self._lookup_hashes(hashes)
+        seen = set()
+        keep = []
+        with self._state_lock:
+            for i, content_hash in enumerate(hashes):
+                if content_hash in self._doc_hashes or content_hash in seen:
+                    continue
+                seen.add(content_hash)
+                keep.append(i)
+        return keep
+    
+    def _lookup_hashes(self, hashes: List[str]):
+        """캐시에 없는 내용 해시만 ChromaDB 메타데이터 필터로 조회해 캐시에 추가
+        
+        시작 시 전체 메타데이터를 읽지 않고 저장 요청에 포함된 해시만 확인합니다.
+        content_hash가 없는 이전 문서는 중복 검사 대상에서 제외됩니다.
+        """
+        with self._state_lock:
+            missing = list(dict.fromkeys(h for h in hashes if h not in self._doc_hashes))
         
-        print(f"💾 문서 저장: {doc_id} (길이: {len(document)}자)")
-        return doc_id
+        for start in range(0, len(missing), HASH_LOOKUP_BATCH):
+            chunk = missing[start:start + HASH_LOOKUP_BATCH]
+            if len(chunk) == 1:
+                where = {"content_hash": chunk[0]}
+            else:
+                where = {"$or": [{"content_hash": content_hash} for content_hash in chunk]}
+            stored = self.collection.get(where=where, include=["metadatas"])
+            found = {
+                metadata["content_hash"]: doc_id
+                for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+                if metadata and "content_hash" in metadata
+            }
+            if found:
+                with self._state_lock:
+                    self._doc_hashes.update(found)
+    
+    def _ids_for(self, hashes: List[str]) -> List[str]:
+        """내용 해시에 해당하는 문서 ID 목록"""
+        with self._state_lock:
+            return [self._doc_hashes.get(content_hash) for content_hash in hashes]
+    
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """여러 텍스트 임베딩 (전용 스레드에서 한 번에 실행)"""
+        return self.kanana_model.embed_many(texts)
+    
+    # ⚡ 비동기 인터페이스 (전용 스레드에서 실행)
+    async def aembed(self, text: str) -> np.ndarray:
+        """텍스트 임베딩 비동기 계산 (동시 요청과 배치 처리)"""
+        return await self.encoder.encode(text)
+    
+    async def asearch_similar(
+        self,
+        query: str,
+        n_results: int = 3,
+        query_embedding: Optional[np.ndarray] = None,
+        include_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        """유사 문서 비동기 검색"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._embed_executor,
+            functools.partial(
+                self.search_similar, query,
+                n_results=n_results,
+                query_embedding=query_embedding,
+                include_metadata=include_metadata
+            )
+        )
+    
+    async def aadd_document(self, document: str, metadata: Dict[str, Any] = None) -> str:
+        """문서 비동기 추가 (이미 저장된 문서면 임베딩 없이 기존 ID 반환)"""
+        loop = asyncio.get_running_loop()
+        content_hash = _content_hash(document)
+        existing_id = self._ids_for([content_hash])[0]
+        if existing_id is None:
+            await loop.run_in_executor(self._write_executor, self._lookup_hashes, [content_hash])
+            existing_id = self._ids_for([content_hash])[0]
+        if existing_id is not None:
+            return existing_id
+        
+        embedding = await self.aembed(document)
+        return await loop.run_in_executor(
+            self._write_executor,
+            functools.partial(self.add_document, document, metadata, embedding=embedding)
+        )
+    
+    async def aadd_documents(self, documents: List[str]) -> List[str]:
+        """여러 문서 비동기 일괄 추가 (배치 임베딩 + 단일 저장)"""
+        loop = asyncio.get_running_loop()
+        
+        # 중복 문서는 임베딩하지 않음 (저장 여부 조회는 쓰기 풀에서)
+        hashes = [_content_hash(document) for document in documents]
+        keep = await loop.run_in_executor(self._write_executor, self._new_document_indices, hashes)
+        new_documents = [documents[i] for i in keep]
+        
+        # 임베딩은 임베딩 풀, ChromaDB 저장은 쓰기 풀에서 실행 (저장 중에도 검색 진행)
+        if new_documents:
+            embeddings = await loop.run_in_executor(self._embed_executor, self._embed_batch, new_documents)
+            await loop.run_in_executor(
+                self._write_executor,
+                functools.partial(self.add_documents, new_documents, embeddings=embeddings)
+            )
+        return self._ids_for(hashes)
+    
+    def close(self):
+        """전용 스레드 풀 정리"""
+        self._embed_executor.shutdown(wait=False, cancel_futures=True)
+        self._write_executor.shutdown(wait=False, cancel_futures=True)
     
-    def get_document_count(self) -> int:
-        """저장된 문서 수 반환"""
+    def get_document_count(self, refresh: bool = False) -> int:
+        """저장된 문서 수 반환 (refresh=True면 ChromaDB에서 다시 계산)"""
         if not self.collection:
             return 0
-        return self.collection.count()
+        if refresh:
+            with self._state_lock:
+                self._doc_count = self.collection.count()
+        return self._doc_count
     
     def get_collection_info(self) -> Dict[str, Any]:
         """컬렉션 정보 반환"""
@@ -128,7 +443,9 @@ class VectorService:
             "status": "initialized",
             "name": self.collection_name,
             "path": self.chroma_path,
-            "count": self.collection.count()
+            "count": self._doc_count,
+            "space": self.space,
+            "embedding_mode": self.embedding_mode
         }
     
     def search_by_id(self, doc_id: str) -> Dict[str, Any]:
@@ -153,7 +470,13 @@ class VectorService:
             raise RuntimeError("VectorService가 초기화되지 않았습니다.")
         
         try:
+            stored = self.collection.get(ids=[doc_id], include=["metadatas"])
             self.collection.delete(ids=[doc_id])
+            with self._state_lock:
+                self._doc_count = max(0, self._doc_count - len(stored["ids"]))
+                for metadata in stored["metadatas"]:
+                    if metadata and "content_hash" in metadata:
+                        self._doc_hashes.pop(metadata["content_hash"], None)
             print(f"🗑️ 문서 삭제: {doc_id}")
             return True
         except Exception as e:
@@ -168,7 +491,13 @@ class VectorService:
         try:
             # 컬렉션 삭제 후 재생성
             self.client.delete_collection(name=self.collection_name)
-            self.collection = self.client.create_collection(name=self.collection_name)
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
+            with self._state_lock:
+                self._doc_count = 0
+                self._doc_hashes.clear()
             print("🗑️ 모든 문서 삭제 완료")
             return True
         except Exception as e:
@@ -0,0 +1,28 @@
+import orjson
+
+from utils.conversation_collector import ConversationCollector
+
+
+def test_collect_writes_line_with_file_lock(tmp_path):
+    """파일 락을 켠 상태(기본값)에서 대화가 실제로 파일에 기록되는지 확인"""
+    collector = ConversationCollector({
+        "data_path": str(tmp_path),
+        "file_lock": True,
+        "filter_system": False
+    })
+    written = []
+    try:
+        assert collector.collect_conversation(
+            "안녕하세요 반갑습니다", "네 안녕하세요 무엇을 도와드릴까요",
+            on_written=written.append
+        )
+        collector.flush()
+    finally:
+        collector.close()
+    
+    lines = (tmp_path / "conversations.jsonl").read_bytes().splitlines()
+    assert len(lines) == 1
+    assert orjson.loads(lines[0])["user_message"] == "안녕하세요 반갑습니다"
+    assert collector.stats["total_collected"] == 1
+    assert collector.stats["write_errors"] == 0
+    assert written == [1]
@@ -1,19 +1,44 @@
 import torch
+import numpy as np
 import json
+import orjson
 import os
+import importlib.util
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from transformers import (
     AutoTokenizer, 
     AutoModelForCausalLM,
     TrainingArguments,
     Trainer,
+    BitsAndBytesConfig,
 )
-from peft import LoraConfig, get_peft_model, TaskType, PeftModel
+from peft import LoraConfig, get_peft_model, TaskType, PeftModel, prepare_model_for_kbit_training
 from datasets import Dataset
 
+from utils.conversation_collector import format_conversation
+
+# 4bit 베이스 모델과 8bit 페이징 옵티마이저는 bitsandbytes가 설치된 경우에만 사용
+HAS_BITSANDBYTES = importlib.util.find_spec("bitsandbytes") is not None
+
+PARALLEL_MAP_MIN_SAMPLES = 100  # map_num_proc을 켠 경우에도 이보다 샘플이 적으면 단일 프로세스로 실행
+
+MAX_SEQ_LENGTH = 512
+
+# 🎯 학습 샘플의 고정 채팅 템플릿: PREFIX + 본문 + MIDDLE + 본문 + SUFFIX
+# 본문(대화 텍스트)만 샘플마다 토크나이징하고 고정 부분은 한 번만 토크나이징해 이어 붙임
+CHAT_PREFIX = """<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+
+당신은 문장을 그대로 읽어주는 친절한 AI 비서입니다.<|eot_id|><|start_header_id|>user<|end_header_id|>
+
+<TARGET>"""
+CHAT_MIDDLE = """</TARGET>TARGET 태그 안의 내용만 출력하세요.<|eot_id|><|start_header_id|>assistant<|end_header_id|>
+
+"""
+CHAT_SUFFIX = "<|eot_id|>"
+
 class CustomDataCollator:
     """커스텀 데이터 콜레이터"""
     def __init__(self, tokenizer, pad_to_multiple_of=None):
@@ -21,33 +46,27 @@ class CustomDataCollator:
         self.pad_to_multiple_of = pad_to_multiple_of
     
     def __call__(self, features):
-        input_ids = [f["input_ids"] for f in features]
-        labels = [f["labels"] for f in features]
+        batch_size = len(features)
+        lengths = [len(f["input_ids"]) for f in features]
         
-        max_length = max(len(ids) for ids in input_ids)
+        max_length = max(lengths)
         if self.pad_to_multiple_of:
             max_length = ((max_length + self.pad_to_multiple_of - 1) // self.pad_to_multiple_of) * self.pad_to_multiple_of
         
-        padded_input_ids = []
-        padded_labels = []
-        attention_masks = []
+        # 패딩 값으로 채운 버퍼를 한 번에 만들고 각 행의 앞부분만 복사
+        input_ids = np.full((batch_size, max_length), self.tokenizer.pad_token_id, dtype=np.int64)
+        labels = np.full((batch_size, max_length), -100, dtype=np.int64)
+        attention_mask = np.zeros((batch_size, max_length), dtype=np.int64)
         
-        for ids, lbls in zip(input_ids, labels):
-            padding_length = max_length - len(ids)
-            
-            padded_ids = ids + [self.tokenizer.pad_token_id] * padding_length
-            padded_input_ids.append(padded_ids)
-            
-            padded_lbls = lbls + [-100] * padding_length
-            padded_labels.append(padded_lbls)
-            
-            attention_mask = [1] * len(ids) + [0] * padding_length
-            attention_masks.append(attention_mask)
+        for i, (feature, length) in enumerate(zip(features, lengths)):
+            input_ids[i, :length] = feature["input_ids"]
+            labels[i, :length] = feature["labels"]
+            attention_mask[i, :length] = 1
         
         return {
-            "input_ids": torch.tensor(padded_input_ids, dtype=torch.long),
-            "attention_mask": torch.tensor(attention_masks, dtype=torch.long),
-            "labels": torch.tensor(padded_labels, dtype=torch.long),
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+            "labels": torch.from_numpy(labels),
         }
 
 class AutomatedFinetuner:
@@ -70,10 +89,26 @@ class AutomatedFinetuner:
         self.lora_r = self.hyperparams.get("lora_r", 8)
         self.lora_alpha = self.hyperparams.get("lora_alpha", 16)
         self.lora_dropout = self.hyperparams.get("lora_dropout", 0.1)
+        # 학습은 CUDA 모델과 여러 스레드를 가진 서버 프로세스 안에서 돌므로 fork 기반 병렬 map은 명시적으로 켤 때만
+        self.map_num_proc = self.hyperparams.get("map_num_proc", 0)
+        self.dataloader_workers = self.hyperparams.get("dataloader_workers", 0)
+        # QLoRA: 고정된 베이스 가중치를 4bit NF4로 로딩 (bitsandbytes 4bit 커널은 CUDA 전용)
+        self.quantize_base = (
+            self.hyperparams.get("quantize_base", True)
+            and HAS_BITSANDBYTES
+            and torch.cuda.is_available()
+        )
         
-        # 상태 추적
+        # 상태 추적 (버전 폴더는 시작 시 한 번만 스캔하고 이후 저장/삭제 시 직접 갱신)
+        self._versions = self._scan_versions()
+        self._dir_size_cache: Dict[Path, int] = {}
+        self._model_versions_cache: Optional[List[Dict[str, Any]]] = None  # 버전 목록이 바뀔 때만 다시 계산
         self.current_version = self._get_next_version()
         self.training_log = []
+        # training_log 요약 (기록할 때마다 함께 갱신해 조회 시 목록을 훑지 않음)
+        self._successful_trainings = 0
+        self._failed_trainings = 0
+        self._total_training_time = 0.0
         
         # 디렉터리 생성
         self.base_output_dir.mkdir(parents=True, exist_ok=True)
@@ -83,66 +118,42 @@ class AutomatedFinetuner:
         print(f"🏷️ 다음 버전: {self.current_version}")
         print(f"🎛️ 하이퍼파라미터: epochs={self.epochs}, lr={self.learning_rate}, r={self.lora_r}")
     
-    def _get_next_version(self) -> str:
-        """다음 버전 번호 계산"""
-        existing_versions = []
+    def _scan_versions(self) -> List[Tuple[int, Path]]:
+        """모델 디렉터리에서 버전 폴더를 찾아 (버전 번호, 경로) 목록을 오름차순으로 반환"""
+        versions = []
+        
+        try:
+            entries = os.scandir(self.base_output_dir)
+        except FileNotFoundError:
+            return versions
         
-        # 기존 모델 디렉터리에서 버전 번호 찾기
-        if self.base_output_dir.exists():
-            for item in self.base_output_dir.iterdir():
-                if item.is_dir() and item.name.startswith(self.version_prefix):
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(self.version_prefix) and entry.is_dir():
                     try:
-                        version_num = int(item.name[len(self.version_prefix):])
-                        existing_versions.append(version_num)
+                        version_num = int(entry.name[len(self.version_prefix):])
                     except ValueError:
                         continue
+                    versions.append((version_num, Path(entry.path)))
         
-        if existing_versions:
-            next_version = max(existing_versions) + 1
-        else:
-            next_version = 1
-        
+        versions.sort(key=lambda x: x[0])
+        return versions
+    
+    def _get_next_version(self) -> str:
+        """다음 버전 번호 계산"""
+        next_version = self._versions[-1][0] + 1 if self._versions else 1
         return f"{self.version_prefix}{next_version}"
     
     def _get_latest_model_path(self) -> Optional[Path]:
         """최신 모델 경로 반환"""
-        if not self.base_output_dir.exists():
-            return None
-        
-        latest_version = 0
-        latest_path = None
-        
-        for item in self.base_output_dir.iterdir():
-            if item.is_dir() and item.name.startswith(self.version_prefix):
-                try:
-                    version_num = int(item.name[len(self.version_prefix):])
-                    if version_num > latest_version:
-                        latest_version = version_num
-                        latest_path = item
-                except ValueError:
-                    continue
-        
-        return latest_path
+        return self._versions[-1][1] if self._versions else None
     
     def _backup_existing_models(self):
         """기존 모델들 백업 관리"""
-        models = []
-        
-        # 모든 버전 모델 찾기
-        for item in self.base_output_dir.iterdir():
-            if item.is_dir() and item.name.startswith(self.version_prefix):
-                try:
-                    version_num = int(item.name[len(self.version_prefix):])
-                    models.append((version_num, item))
-                except ValueError:
-                    continue
-        
-        # 버전 순으로 정렬
-        models.sort(key=lambda x: x[0])
-        
-        # 백업 개수 초과 시 오래된 모델 삭제
-        while len(models) >= self.backup_count:
-            old_version, old_path = models.pop(0)
+        # 백업 개수 초과 시 오래된 모델 삭제 (버전 목록은 오름차순)
+        while len(self._versions) >= self.backup_count:
+            old_version, old_path = self._versions.pop(0)
+            self._model_versions_cache = None
             if old_path.exists():
                 print(f"🗑️ 오래된 모델 삭제: {old_path.name}")
                 shutil.rmtree(old_path)
@@ -151,8 +162,8 @@ class AutomatedFinetuner:
         """대화 데이터를 파인튜닝 형태로 변환"""
         print(f"🔄 학습 데이터 변환: {dataset_path}")
         
-        with open(dataset_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(dataset_path, 'rb') as f:
+            data = orjson.loads(f.read())
         
         # 이미 올바른 형태라면 그대로 사용
         if isinstance(data, list) and len(data) > 0:
@@ -170,54 +181,64 @@ class AutomatedFinetuner:
                     conversation_text = item['to_training_format']()
                 elif 'user_message' in item and 'assistant_response' in item:
                     # 직접 대화 형태
-                    conversation_text = f"USER : {item['user_message']}<\\n>ASSISTANT : {item['assistant_response']}"
+                    conversation_text = format_conversation(item['user_message'], item['assistant_response'])
                 else:
                     continue
                 
-                # 올바른 대화 형식으로 변환
+                # 채팅 템플릿은 토크나이징 시 붙이므로 본문만 저장
                 training_sample = {
-                    "text": self._create_chat_format(conversation_text),
+                    "body": conversation_text,
                     "metadata": item.get('metadata', {})
                 }
                 
                 training_data.append(training_sample)
         
-        # 변환된 데이터 저장
-        converted_path = self.data_path / f"converted_training_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(converted_path, 'w', encoding='utf-8') as f:
-            json.dump(training_data, f, ensure_ascii=False, indent=2)
+        # 변환된 데이터 저장 (JSONL: 한 줄에 샘플 하나, Arrow로 바로 메모리 매핑 가능)
+        converted_path = self.data_path / f"converted_training_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        with open(converted_path, 'wb') as f:
+            f.writelines(
+                orjson.dumps(sample, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+                for sample in training_data
+            )
         
         print(f"✅ 변환 완료: {len(training_data)}개 샘플 → {converted_path}")
         return str(converted_path)
     
-    def _create_chat_format(self, conversation_text: str) -> str:
-        """대화를 올바른 채팅 형태로 변환"""
-        return f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
-
-당신은 문장을 그대로 읽어주는 친절한 AI 비서입니다.<|eot_id|><|start_header_id|>user<|end_header_id|>
-
-<TARGET>{conversation_text}</TARGET>TARGET 태그 안의 내용만 출력하세요.<|eot_id|><|start_header_id|>assistant<|end_header_id|>
-
-{conversation_text}<|eot_id|>"""
-    
     def _setup_model_and_tokenizer(self, existing_adapter_path: Optional[str] = None):
         """모델과 토크나이저 설정 (기존 어댑터 로드 포함)"""
         print(f"🚀 모델 로딩: {self.model_name}")
         
         # 토크나이저 로드
-        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)  # Rust 기반 fast 토크나이저
         if tokenizer.pad_token is None:
             tokenizer.pad_token = tokenizer.eos_token
         
-        # 베이스 모델 로드
+        # 베이스 모델 로드 (QLoRA면 4bit NF4 가중치 + bf16 연산)
+        if self.quantize_base:
+            model_kwargs = {
+                "quantization_config": BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.bfloat16,
+                    bnb_4bit_use_double_quant=True,
+                )
+            }
+        else:
+            model_kwargs = {"torch_dtype": torch.bfloat16}
+        
         base_model = AutoModelForCausalLM.from_pretrained(
             self.model_name,
-            torch_dtype=torch.bfloat16,
             trust_remote_code=True,
             device_map="auto",
             use_cache=False,
+            **model_kwargs,
         )
         
+        if self.quantize_base:
+            # 정규화 레이어 fp32 변환 등 k-bit 학습 준비 (gradient checkpointing은 Trainer가 켬)
+            base_model = prepare_model_for_kbit_training(base_model, use_gradient_checkpointing=False)
+            print("🧮 베이스 모델 4bit NF4 로딩 (QLoRA)")
+        
         # 기존 어댑터가 있다면 로드
         if existing_adapter_path and Path(existing_adapter_path).exists():
             print(f"🔄 기존 어댑터 로드: {existing_adapter_path}")
@@ -261,89 +282,51 @@ class AutomatedFinetuner:
         """데이터셋 로드 및 전처리 - 완전히 올바른 라벨 마스킹"""
         print(f"📂 데이터셋 로딩: {dataset_file}")
         
-        with open(dataset_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Arrow 캐시 파일로 변환 후 메모리 매핑 (전체 데이터를 파이썬 객체로 올리지 않음)
+        dataset = Dataset.from_json(dataset_file)
         
-        print(f"📊 총 {len(data)}개의 학습 샘플")
+        print(f"📊 총 {len(dataset)}개의 학습 샘플")
         
-        dataset = Dataset.from_list(data)
+        # 🎯 고정 템플릿 부분은 한 번만 토크나이징
+        prefix_ids = tokenizer(CHAT_PREFIX, add_special_tokens=False)["input_ids"]
+        middle_ids = tokenizer(CHAT_MIDDLE, add_special_tokens=False)["input_ids"]
+        suffix_ids = tokenizer(CHAT_SUFFIX, add_special_tokens=False)["input_ids"]
         
         def tokenize_function(examples):
-            """🔥 완전히 올바른 토크나이징 및 라벨 마스킹"""
-            model_inputs = tokenizer(
-                examples["text"],
-                truncation=True,
-                padding=False,
-                max_length=512,
-                return_overflowing_tokens=False,
-            )
+            """🔥 본문만 토크나이징해 템플릿과 조립 (assistant 응답 + 종료 토큰만 학습 대상)"""
+            bodies = tokenizer(examples["body"], add_special_tokens=False)["input_ids"]
             
+            input_ids_list = []
+            attention_masks = []
             labels = []
             
-            for i, text in enumerate(examples["text"]):
-                input_ids = model_inputs["input_ids"][i]
-                
-                # 🎯 핵심: 문자열 기반으로 assistant 부분 찾기
-                text_str = text
+            for body_ids in bodies:
+                # user 슬롯과 assistant 슬롯에 같은 본문이 들어가므로 토큰도 재사용
+                prompt_ids = prefix_ids + body_ids + middle_ids
+                answer_ids = body_ids + suffix_ids
                 
-                # assistant 헤더 부분과 응답 부분 분리
-                assistant_header = "<|start_header_id|>assistant<|end_header_id|>\n\n"
-                
-                if assistant_header in text_str:
-                    # assistant 응답 시작 위치 찾기
-                    assistant_start_pos = text_str.find(assistant_header) + len(assistant_header)
-                    
-                    # 마지막 <|eot_id|> 찾기
-                    last_eot_pos = text_str.rfind("<|eot_id|>")
-                    
-                    if last_eot_pos > assistant_start_pos:
-                        # assistant 응답 부분만 추출
-                        assistant_response = text_str[assistant_start_pos:last_eot_pos]
-                        
-                        # 🔥 핵심: 전체 텍스트에서 assistant 응답 부분의 토큰 위치 찾기
-                        before_assistant = text_str[:assistant_start_pos]
-                        
-                        # before_assistant를 토크나이징해서 길이 확인
-                        before_tokens = tokenizer(before_assistant, add_special_tokens=False)["input_ids"]
-                        assistant_tokens = tokenizer(assistant_response, add_special_tokens=False)["input_ids"]
-                        
-                        # labels 초기화
-                        label = [-100] * len(input_ids)
-                        
-                        # 🎯 중요: 실제 토큰 인덱스에서 assistant 부분 찾기
-                        if len(assistant_tokens) > 0:
-                            # assistant 토큰들이 전체 input_ids에서 시작하는 위치 찾기
-                            for start_idx in range(len(input_ids) - len(assistant_tokens) + 1):
-                                # assistant_tokens와 일치하는 부분 찾기
-                                if input_ids[start_idx:start_idx + len(assistant_tokens)] == assistant_tokens:
-                                    # 찾았으면 해당 부분만 학습 대상으로 설정
-                                    for j in range(start_idx, start_idx + len(assistant_tokens)):
-                                        if j < len(input_ids):
-                                            label[j] = input_ids[j]
-                                    break
-                            else:
-                                # 매칭 실패 시 대안: 뒤에서부터 찾기
-                                estimated_start = len(input_ids) - len(assistant_tokens) - 2
-                                if estimated_start > 0:
-                                    for j in range(estimated_start, len(input_ids) - 1):
-                                        if j >= 0:
-                                            label[j] = input_ids[j]
-                    else:
-                        print(f"Warning: assistant 응답 부분을 찾지 못했습니다")
-                        label = [-100] * len(input_ids)
-                else:
-                    print(f"Warning: assistant 헤더가 없습니다")
-                    label = [-100] * len(input_ids)
+                input_ids = (prompt_ids + answer_ids)[:MAX_SEQ_LENGTH]
+                label = ([-100] * len(prompt_ids) + answer_ids)[:MAX_SEQ_LENGTH]
                 
+                input_ids_list.append(input_ids)
+                attention_masks.append([1] * len(input_ids))
                 labels.append(label)
             
-            model_inputs["labels"] = labels
-            return model_inputs
+            return {
+                "input_ids": input_ids_list,
+                "attention_mask": attention_masks,
+                "labels": labels
+            }
         
-        # 배치 토크나이징
+        # 배치 토크나이징 (map_num_proc을 켜고 데이터가 많을 때만 멀티프로세스, 기본은 서버 프로세스 안에서 실행)
+        num_proc = None
+        if self.map_num_proc > 1 and len(dataset) > PARALLEL_MAP_MIN_SAMPLES:
+            num_proc = min(self.map_num_proc, os.cpu_count() or 1)
         tokenized_dataset = dataset.map(
             tokenize_function, 
             batched=True,
+            batch_size=1000,
+            num_proc=num_proc,
             remove_columns=dataset.column_names
         )
         
@@ -358,6 +341,8 @@ class AutomatedFinetuner:
     
     def _setup_training_arguments(self, output_dir: str):
         """훈련 설정"""
+        use_bf16 = torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+        
         training_args = TrainingArguments(
             output_dir=output_dir,
             overwrite_output_dir=True,
@@ -383,18 +368,22 @@ class AutomatedFinetuner:
             logging_dir=f"{output_dir}/logs",
             logging_steps=10,
             
+            # 데이터 로딩 (워커 프로세스는 설정한 경우에만, 고정 메모리로 GPU 복사를 연산과 겹침)
+            dataloader_num_workers=self.dataloader_workers,  # 데이터는 이미 메모리에 토크나이징돼 있어 기본 0
+            dataloader_pin_memory=torch.cuda.is_available(),
+            
             # 기타
-            dataloader_pin_memory=False,
             remove_unused_columns=False,
             report_to=[],
             
-            # 정밀도
-            fp16=True,
-            bf16=False,
+            # 정밀도 (모델을 bfloat16으로 로딩하므로 지원되면 bf16 AMP 사용)
+            fp16=not use_bf16,
+            bf16=use_bf16,
             
-            # 메모리 최적화
-            gradient_checkpointing=False,
-            dataloader_num_workers=0,
+            # 메모리 최적화 (활성값은 역전파 때 재계산, 옵티마이저 상태는 8bit 페이징)
+            gradient_checkpointing=True,
+            gradient_checkpointing_kwargs={"use_reentrant": False},
+            optim="paged_adamw_8bit" if HAS_BITSANDBYTES else "adamw_torch",
             max_grad_norm=0.5,
             
             load_best_model_at_end=False,
@@ -403,6 +392,7 @@ class AutomatedFinetuner:
         print("🎛️ 훈련 설정:")
         print(f"- 에폭: {training_args.num_train_epochs}")
         print(f"- 학습률: {training_args.learning_rate}")
+        print(f"- 정밀도: {'bf16' if use_bf16 else 'fp16'}, 옵티마이저: {training_args.optim}")
         print(f"- 출력 경로: {output_dir}")
         
         return training_args
@@ -432,6 +422,8 @@ class AutomatedFinetuner:
             model, tokenizer = self._setup_model_and_tokenizer(existing_adapter_path)
             
             # 5. LoRA 설정 (기존 어댑터가 없을 때만)
+            # gradient checkpointing + 고정된 베이스 가중치에서도 입력 임베딩 출력에 grad가 흐르도록 설정
+            model.enable_input_require_grads()
             if not isinstance(model, PeftModel):
                 lora_config = self._setup_lora_config()
                 model = get_peft_model(model, lora_config)
@@ -495,13 +487,17 @@ class AutomatedFinetuner:
             }
             
             self.training_log.append(log_entry)
+            self._successful_trainings += 1
+            self._total_training_time += training_time
             self._save_training_log()
             
             print(f"✅ 파인튜닝 완료! (버전: {self.current_version})")
             print(f"📁 저장 경로: {output_dir}")
             print(f"⏱️ 소요 시간: {training_time:.2f}초")
             
-            # 다음 버전 번호 업데이트
+            # 버전 목록 및 다음 버전 번호 업데이트
+            self._versions.append((int(self.current_version[len(self.version_prefix):]), output_dir))
+            self._model_versions_cache = None
             self.current_version = self._get_next_version()
             
             return {
@@ -525,6 +521,7 @@ class AutomatedFinetuner:
             }
             
             self.training_log.append(error_log)
+            self._failed_trainings += 1
             self._save_training_log()
             
             print(f"❌ 파인튜닝 실패: {e}")
@@ -540,32 +537,58 @@ class AutomatedFinetuner:
         """훈련 히스토리 반환"""
         return self.training_log.copy()
     
+    def get_training_summary(self) -> Dict[str, Any]:
+        """훈련 성공/실패 횟수와 평균 소요 시간 반환 (O(1))"""
+        succeeded = self._successful_trainings
+        total = succeeded + self._failed_trainings
+        return {
+            "total_trainings": succeeded,
+            "failed_trainings": self._failed_trainings,
+            "avg_training_time_seconds": self._total_training_time / succeeded if succeeded > 0 else 0,
+            "success_rate": succeeded / total * 100 if total > 0 else 0
+        }
+    
+    def _dir_size(self, path: Path) -> int:
+        """디렉터리 전체 크기(bytes) 계산 (저장이 끝난 버전 폴더는 바뀌지 않으므로 캐시)"""
+        cached = self._dir_size_cache.get(path)
+        if cached is not None:
+            return cached
+        
+        total = 0
+        pending = [str(path)]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        
+        self._dir_size_cache[path] = total
+        return total
+    
     def get_model_versions(self) -> List[Dict[str, Any]]:
-        """모델 버전 목록 반환"""
-        versions = []
+        """모델 버전 목록 반환 (학습 완료/백업 정리로 버전 목록이 바뀔 때까지 캐시)"""
+        if self._model_versions_cache is not None:
+            return list(self._model_versions_cache)
         
-        if not self.base_output_dir.exists():
-            return versions
+        versions = []
         
-        for item in self.base_output_dir.iterdir():
-            if item.is_dir() and item.name.startswith(self.version_prefix):
-                try:
-                    version_num = int(item.name[len(self.version_prefix):])
-                    
-                    # 모델 정보 수집
-                    version_info = {
-                        "version": item.name,
-                        "version_number": version_num,
-                        "path": str(item),
-                        "created_time": datetime.fromtimestamp(item.stat().st_ctime).isoformat(),
-                        "size_mb": sum(f.stat().st_size for f in item.rglob('*') if f.is_file()) / (1024*1024)
-                    }
-                    
-                    versions.append(version_info)
-                    
-                except ValueError:
-                    continue
+        # 최신 버전부터
+        for version_num, item in reversed(self._versions):
+            try:
+                # 모델 정보 수집
+                version_info = {
+                    "version": item.name,
+                    "version_number": version_num,
+                    "path": str(item),
+                    "created_time": datetime.fromtimestamp(item.stat().st_ctime).isoformat(),
+                    "size_mb": self._dir_size(item) / (1024*1024)
+                }
+            except FileNotFoundError:
+                continue  # 외부에서 삭제된 경우
+            
+            versions.append(version_info)
         
-        # 버전 번호로 정렬
-        versions.sort(key=lambda x: x["version_number"], reverse=True)
-        return versions
\ No newline at end of file
+        self._model_versions_cache = versions
+        return list(versions)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Tuple
+
+class BatchingEncoder:
+    """동시에 들어온 임베딩 요청을 짧은 시간창 동안 모아 한 번에 처리 (동적 배칭)"""
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[str]], List[Any]],
+        executor: Executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle = None
+        self._tasks = set()
+
+        # 통계
+        self.total_batches = 0
+        self.total_items = 0
+
+    async def encode(self, text: str):
+        """텍스트 하나를 임베딩 (다른 요청과 함께 배치 처리될 수 있음)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """대기 중인 요청을 하나의 배치로 실행"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """배치 임베딩 실행 후 각 요청에 결과 전달"""
+        texts = [text for text, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        try:
+            embeddings = await loop.run_in_executor(self.executor, self.batch_fn, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.total_batches += 1
+        self.total_items += len(batch)
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """배칭 통계 반환"""
+        return {
+            "total_batches": self.total_batches,
+            "total_items": self.total_items,
+            "avg_batch_size": self.total_items / self.total_batches if self.total_batches > 0 else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
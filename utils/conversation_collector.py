@@ -1,13 +1,46 @@
-import json
+import orjson
 import os
+import re
+import mmap
+import queue
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, Callable
 from pathlib import Path
-import portalocker as fcntl
 import threading
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
-@dataclass
+try:
+    import fcntl  # POSIX: 표준 라이브러리 flock으로 파일 락
+except ImportError:
+    fcntl = None
+
+try:
+    import portalocker  # 선택 의존성: fcntl이 없는 플랫폼(Windows)의 파일 락
+except ImportError:
+    portalocker = None
+
+# 대화 한 턴의 저장 형식 (벡터 DB 문서와 파인튜닝 데이터가 같은 형식을 공유)
+TURN_SEPARATOR = "<\\n>"
+USER_PREFIX = "USER : "
+ASSISTANT_PREFIX = TURN_SEPARATOR + "ASSISTANT : "
+
+# 시스템 메시지 필터링 키워드 (대소문자 무시, 하나의 정규식으로 미리 컴파일해 한 번에 탐색)
+SYSTEM_KEYWORDS = (
+    "초기화", "설정", "오류", "서버", "모델", "로딩", "API",
+    "시스템", "에러", "debug", "test", "health", "status"
+)
+SYSTEM_KEYWORD_PATTERN = re.compile("|".join(map(re.escape, SYSTEM_KEYWORDS)), re.IGNORECASE)
+
+APPEND_BATCH_MAX = 64  # 기록 스레드가 한 번의 write로 묶어 쓰는 최대 줄 수
+
+# 추가 전용으로 열어두는 파일 플래그 (O_APPEND: 커널이 항상 파일 끝에 기록)
+APPEND_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+
+def format_conversation(user_message: str, assistant_response: str) -> str:
+    """USER/ASSISTANT 한 턴을 문서 문자열로 변환 (미리 만든 접두사로 한 번에 결합)"""
+    return "".join((USER_PREFIX, user_message, ASSISTANT_PREFIX, assistant_response))
+
+@dataclass(slots=True)
 class ConversationEntry:
     """대화 엔트리 데이터 클래스"""
     user_message: str
@@ -19,11 +52,44 @@ class ConversationEntry:
     
     def to_training_format(self) -> str:
         """파인튜닝용 형태로 변환"""
-        return f"USER : {self.user_message}<\\n>ASSISTANT : {self.assistant_response}"
+        return format_conversation(self.user_message, self.assistant_response)
     
     def to_dict(self) -> Dict[str, Any]:
-        """딕셔너리로 변환"""
-        return asdict(self)
+        """딕셔너리로 변환 (asdict()의 재귀 깊은 복사 없이 얕은 딕셔너리)"""
+        return {
+            "user_message": self.user_message,
+            "assistant_response": self.assistant_response,
+            "timestamp": self.timestamp,
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "metadata": self.metadata
+        }
+
+# JSONL 한 줄의 고정 골격 (필드 순서는 ConversationEntry와 동일)
+_LINE_USER = b'{"user_message":'
+_LINE_ASSISTANT = b',"assistant_response":'
+_LINE_TIMESTAMP = b',"timestamp":"'
+_LINE_USER_ID = b'","user_id":'
+_LINE_SESSION_ID = b',"session_id":'
+_LINE_METADATA = b',"metadata":'
+_LINE_END = b'}\n'
+
+def _entry_to_jsonl(entry: ConversationEntry) -> bytes:
+    """엔트리를 JSONL 한 줄(bytes)로 직렬화
+    
+    키와 구두점은 미리 만든 bytes 골격을 쓰고 값만 orjson으로 인코딩합니다.
+    timestamp는 datetime.isoformat() 결과라 이스케이프가 필요 없어 그대로 넣습니다.
+    """
+    dumps = orjson.dumps
+    return b"".join((
+        _LINE_USER, dumps(entry.user_message),
+        _LINE_ASSISTANT, dumps(entry.assistant_response),
+        _LINE_TIMESTAMP, entry.timestamp.encode("ascii"),
+        _LINE_USER_ID, dumps(entry.user_id),
+        _LINE_SESSION_ID, dumps(entry.session_id),
+        _LINE_METADATA, dumps(entry.metadata, option=orjson.OPT_NON_STR_KEYS),
+        _LINE_END,
+    ))
 
 class ConversationCollector:
     """실시간 대화 수집 시스템"""
@@ -33,6 +99,7 @@ class ConversationCollector:
         self.min_length = config.get("min_length", 5)
         self.max_length = config.get("max_length", 2000)
         self.filter_system = config.get("filter_system", True)
+        self.file_lock = config.get("file_lock", True)  # 단일 프로세스면 O_APPEND 기록만으로 충분
         self.data_path = config.get("data_path", "./data/finetune")
         self.file_name = config.get("file_name", "conversations.jsonl")
         
@@ -45,16 +112,30 @@ class ConversationCollector:
             "total_collected": 0,
             "filtered_out": 0,
             "last_collection": None,
-            "file_size_kb": 0
+            "file_size_kb": 0,
+            "write_errors": 0  # 기록 스레드에서 파일에 쓰지 못한 대화 수
         }
         
         # 스레드 안전성을 위한 락
         self.lock = threading.Lock()
+        self._file_bytes = 0
+        self._fd: Optional[int] = None  # 기록용 fd (처음 기록할 때 열고 수집기 수명 동안 유지)
+        self._lock_file = None  # portalocker용 파일 객체 (같은 fd를 감싸며 fd는 닫지 않음)
+        
+        if self.file_lock and fcntl is None and portalocker is None:
+            print("⚠️ 파일 락을 사용할 수 없습니다 (fcntl/portalocker 없음). 락 없이 기록합니다.")
+            self.file_lock = False
         
         # 초기화
         self._ensure_directory()
         self._load_stats()
         
+        # JSONL 추가 기록은 전용 스레드가 대기열에 쌓인 줄을 모아 한 번에 기록
+        # (JSONL 줄, 수집 시각, 기록 후 콜백) 항목, None은 종료 신호
+        self._append_queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="conversation-writer", daemon=True)
+        self._writer_thread.start()
+        
         print(f"📚 대화 수집기 초기화: {'활성화' if self.enabled else '비활성화'}")
         if self.enabled:
             print(f"📁 저장 경로: {self.file_path}")
@@ -69,13 +150,15 @@ class ConversationCollector:
         """통계 로드"""
         if self.file_path.exists():
             try:
-                # 파일 크기 계산
-                self.stats["file_size_kb"] = round(self.file_path.stat().st_size / 1024, 2)
+                # 파일 크기 계산 (이후에는 기록한 바이트 수로 갱신)
+                self._file_bytes = self.file_path.stat().st_size
+                self.stats["file_size_kb"] = round(self._file_bytes / 1024, 2)
                 
-                # 라인 수 계산 (총 수집 개수)
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    lines = sum(1 for _ in f)
-                    self.stats["total_collected"] = lines
+                # 라인 수 계산 (총 수집 개수, 1MB 청크마다 bytes.count로 C 수준에서 줄바꿈만 셈)
+                with open(self.file_path, 'rb') as f:
+                    self.stats["total_collected"] = sum(
+                        chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")
+                    )
                     
             except Exception as e:
                 print(f"⚠️ 통계 로드 실패: {e}")
@@ -101,17 +184,12 @@ class ConversationCollector:
         if assistant_len > self.max_length:
             return False, f"응답 메시지 너무 김 ({assistant_len}자 > {self.max_length}자)"
         
-        # 시스템 메시지 필터링
+        # 시스템 메시지 필터링 (메시지를 합치거나 소문자로 복사하지 않고 각각 한 번씩 탐색)
         if self.filter_system:
-            system_keywords = [
-                "초기화", "설정", "오류", "서버", "모델", "로딩", "API", 
-                "시스템", "에러", "debug", "test", "health", "status"
-            ]
-            
-            combined_text = (user_message + " " + assistant_response).lower()
-            for keyword in system_keywords:
-                if keyword in combined_text:
-                    return False, f"시스템 메시지 필터링됨 (키워드: {keyword})"
+            for text in (user_message, assistant_response):
+                match = SYSTEM_KEYWORD_PATTERN.search(text)
+                if match:
+                    return False, f"시스템 메시지 필터링됨 (키워드: {match.group()})"
         
         return True, "유효함"
     
@@ -121,9 +199,14 @@ class ConversationCollector:
         assistant_response: str,
         user_id: str = "default",
         session_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        on_written: Optional[Callable[[int], None]] = None
     ) -> bool:
-        """대화 수집"""
+        """대화 수집 (기록 대기열에 추가되면 True)
+        
+        on_written은 대화가 실제로 파일에 기록된 뒤 기록 스레드에서
+        그 대화까지 반영된 total_collected 값으로 호출됩니다. 기록에 실패하면 호출되지 않습니다.
+        """
         
         # 유효성 검증
         is_valid, reason = self.is_valid_conversation(user_message, assistant_response)
@@ -143,78 +226,213 @@ class ConversationCollector:
             metadata=metadata or {}
         )
         
-        # 파일에 저장 (스레드 안전)
-        success = self._save_to_file(entry)
+        # 파일에 저장 (스레드 안전, 직렬화된 bytes만 대기열에 들어감)
+        success = self._save_to_file(entry, on_written)
         
-        if success:
-            self.stats["total_collected"] += 1
-            self.stats["last_collection"] = entry.timestamp
-            print(f"💾 대화 수집 완료: {self.stats['total_collected']}번째")
-            return True
-        else:
+        # total_collected/last_collection은 기록 스레드가 파일에 쓴 뒤에 갱신
+        if not success:
             print(f"❌ 대화 저장 실패")
-            return False
+        return success
     
-    def _save_to_file(self, entry: ConversationEntry) -> bool:
-        """파일에 안전하게 저장"""
+    def _save_to_file(self, entry: ConversationEntry, on_written: Optional[Callable[[int], None]] = None) -> bool:
+        """JSONL 한 줄로 직렬화해 기록 대기열에 추가 (실제 기록은 기록 스레드가 묶어서 수행)"""
+        if not self._writer_thread.is_alive():
+            print("❌ 파일 저장 오류: 기록 스레드가 종료됨")
+            return False
+        
         try:
-            with self.lock:
-                # JSONL 형태로 저장
-                with open(self.file_path, 'a', encoding='utf-8') as f:
-                    # 파일 락킹 (다중 프로세스 환경에서 안전)
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                    try:
-                        json.dump(entry.to_dict(), f, ensure_ascii=False)
-                        f.write('\n')
-                    finally:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                
-                # 파일 크기 업데이트
-                self.stats["file_size_kb"] = round(self.file_path.stat().st_size / 1024, 2)
-            
-            return True
-            
+            line = _entry_to_jsonl(entry)
         except Exception as e:
             print(f"❌ 파일 저장 오류: {e}")
             return False
-    
-    def get_collected_conversations(self, limit: Optional[int] = None) -> List[ConversationEntry]:
-        """수집된 대화 목록 반환"""
-        conversations = []
         
-        if not self.file_path.exists():
-            return conversations
+        self._append_queue.put((line, entry.timestamp, on_written))
+        return True
+    
+    def _writer_loop(self):
+        """대기열의 줄을 최대 APPEND_BATCH_MAX개씩 모아 한 번의 write로 기록"""
+        running = True
+        while running:
+            batch = [self._append_queue.get()]
+            while len(batch) < APPEND_BATCH_MAX:
+                try:
+                    batch.append(self._append_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            # None은 종료 신호
+            items = [item for item in batch if item is not None]
+            running = len(items) == len(batch)
+            
+            try:
+                if items:
+                    total = self._write_lines([item[0] for item in items], items[-1][1])
+                    if total is not None:
+                        self._notify_written(items, total)
+            finally:
+                for _ in batch:
+                    self._append_queue.task_done()
+    
+    def _write_lines(self, lines: List[bytes], last_timestamp: str) -> Optional[int]:
+        """여러 줄을 파일에 안전하게 추가 (열어둔 fd에 os.write)
         
+        기록에 성공한 줄만 total_collected에 반영하고 기록 후의 total_collected를 반환합니다.
+        실패하면 write_errors를 늘리고 None을 반환합니다.
+        """
+        payload = b"".join(lines)
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            with self.lock:
+                if self._fd is None:
+                    self._fd = os.open(self.file_path, APPEND_FLAGS, 0o644)
+                
+                # 파일 락킹 (다중 프로세스 환경, 일반 파일의 write는 크기와 관계없이 원자성이 보장되지 않음)
+                if self.file_lock:
+                    self._lock_fd()
+                try:
+                    view = memoryview(payload)
+                    while view:
+                        view = view[os.write(self._fd, view):]
+                finally:
+                    if self.file_lock:
+                        self._unlock_fd()
                 
-                # 최신 순으로 제한
-                if limit:
-                    lines = lines[-limit:]
+                # 파일 크기는 stat() 없이 기록한 바이트 수로 갱신
+                self._file_bytes += len(payload)
+                self.stats["file_size_kb"] = round(self._file_bytes / 1024, 2)
                 
-                for line in lines:
-                    if line.strip():
-                        data = json.loads(line.strip())
-                        conversations.append(ConversationEntry(**data))
+                self.stats["total_collected"] += len(lines)
+                self.stats["last_collection"] = last_timestamp
+                total = self.stats["total_collected"]
             
-            return conversations
+            print(f"💾 대화 수집 완료: {len(lines)}개 기록 (총 {total}개)")
+            return total
+        
+        except Exception as e:
+            self.stats["write_errors"] += len(lines)
+            print(f"❌ 파일 저장 오류 ({len(lines)}개): {e}")
+            return None
+    
+    @staticmethod
+    def _notify_written(items: List[tuple], total: int):
+        """기록된 대화의 on_written 콜백 호출 (각 대화 시점의 total_collected 전달, 콜백 오류는 기록 스레드를 멈추지 않음)"""
+        first = total - len(items)
+        for i, (_, _, on_written) in enumerate(items, 1):
+            if on_written is None:
+                continue
+            try:
+                on_written(first + i)
+            except Exception as e:
+                print(f"⚠️ 대화 기록 후 처리 오류: {e}")
+    
+    def flush(self):
+        """대기 중인 대화가 모두 파일에 기록될 때까지 대기 (기록 스레드가 종료됐으면 바로 반환)"""
+        if not self._writer_thread.is_alive():
+            return
+        self._append_queue.join()
+    
+    def close(self):
+        """남은 대화를 기록하고 기록 스레드 종료"""
+        if self._writer_thread.is_alive():
+            self._append_queue.put(None)
+            self._writer_thread.join()
+        
+        with self.lock:
+            self._close_fd()
+    
+    def _lock_fd(self):
+        """기록용 파일에 배타 락 (POSIX는 fcntl.flock, 그 외에는 portalocker, self.lock을 잡은 상태에서 호출)"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self._fd, "ab", buffering=0, closefd=False)
+        portalocker.lock(self._lock_file, portalocker.LOCK_EX)
+    
+    def _unlock_fd(self):
+        """_lock_fd()로 잡은 파일 락 해제"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            portalocker.unlock(self._lock_file)
+    
+    def _close_fd(self):
+        """기록용 fd 닫기 (self.lock을 잡은 상태에서 호출)"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _iter_lines(self, limit: Optional[int] = None) -> Iterator[bytes]:
+        """저장된 JSONL의 비어 있지 않은 줄(bytes)을 순서대로 반환 (limit이 있으면 마지막 limit줄만)"""
+        self.flush()
+        if not self.file_path.exists():
+            return
+        
+        if limit:
+            # 최신 순으로 제한 (파일 끝에서부터 limit줄만 읽음)
+            yield from self._tail_lines(limit)
+            return
+        
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+    
+    def iter_collected_conversations(self, limit: Optional[int] = None) -> Iterator[ConversationEntry]:
+        """수집된 대화를 한 건씩 반환 (전체 목록을 메모리에 만들지 않음)
+        
+        읽기/파싱 오류는 호출한 쪽으로 그대로 전달합니다 (잘린 목록을 정상 결과처럼 반환하지 않음).
+        """
+        for line in self._iter_lines(limit):
+            yield ConversationEntry(**orjson.loads(line))
+    
+    def _tail_lines(self, n: int) -> List[bytes]:
+        """파일의 마지막 n개 (비어 있지 않은) 줄을 순서대로 반환 (mmap으로 끝에서부터 역방향 탐색)"""
+        with open(self.file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            
+            lines = []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm)
+                while end > 0 and len(lines) < n:
+                    start = mm.rfind(b"\n", 0, end) + 1
+                    line = mm[start:end].strip()
+                    if line:
+                        lines.append(line)
+                    end = start - 1
+            
+            lines.reverse()
+            return lines
+    
+    def get_collected_conversations(self, limit: Optional[int] = None) -> List[ConversationEntry]:
+        """수집된 대화 목록 반환 (오류가 나면 그 전까지 읽은 대화만 반환)"""
+        conversations = []
+        try:
+            conversations.extend(self.iter_collected_conversations(limit))
+        except Exception as e:
+            print(f"❌ 대화 로드 오류: {e}")
+        return conversations
+    
+    def iter_training_data(self, limit: Optional[int] = None) -> Iterator[str]:
+        """파인튜닝용 형태의 대화를 한 건씩 반환 (엔트리 객체 없이 필요한 두 필드만 사용)"""
+        try:
+            for line in self._iter_lines(limit):
+                conv = orjson.loads(line)
+                yield format_conversation(conv["user_message"], conv["assistant_response"])
             
         except Exception as e:
             print(f"❌ 대화 로드 오류: {e}")
-            return []
     
     def get_training_data(self, limit: Optional[int] = None) -> List[str]:
         """파인튜닝용 형태로 대화 반환"""
-        conversations = self.get_collected_conversations(limit)
-        return [conv.to_training_format() for conv in conversations]
+        return list(self.iter_training_data(limit))
     
     def get_stats(self) -> Dict[str, Any]:
         """수집 통계 반환"""
-        # 실시간 파일 크기 업데이트
-        if self.file_path.exists():
-            self.stats["file_size_kb"] = round(self.file_path.stat().st_size / 1024, 2)
-        
         return {
             **self.stats,
             "enabled": self.enabled,
@@ -228,6 +446,7 @@ class ConversationCollector:
     
     def backup_conversations(self) -> bool:
         """대화 데이터 백업"""
+        self.flush()
         if not self.file_path.exists():
             print("⚠️ 백업할 파일이 없습니다.")
             return False
@@ -255,16 +474,22 @@ class ConversationCollector:
             self.backup_conversations()
         
         try:
-            if self.file_path.exists():
-                self.file_path.unlink()
-            
-            # 통계 초기화
-            self.stats = {
-                "total_collected": 0,
-                "filtered_out": 0,
-                "last_collection": None,
-                "file_size_kb": 0
-            }
+            self.flush()
+            with self.lock:
+                # 삭제된 파일에 계속 쓰지 않도록 fd를 닫음 (다음 기록 시 새 파일로 다시 열림)
+                self._close_fd()
+                if self.file_path.exists():
+                    self.file_path.unlink()
+                self._file_bytes = 0
+                
+                # 통계 초기화 (기록 스레드도 self.lock 안에서 갱신)
+                self.stats = {
+                    "total_collected": 0,
+                    "filtered_out": 0,
+                    "last_collection": None,
+                    "file_size_kb": 0,
+                    "write_errors": 0
+                }
             
             print("🗑️ 대화 데이터 초기화 완료")
             return True
@@ -280,39 +505,52 @@ class ConversationCollector:
         else:
             output_path = Path(output_path)
         
-        conversations = self.get_collected_conversations()
-        
-        if not conversations:
+        self.flush()
+        if not self.file_path.exists():
             print("⚠️ 내보낼 대화가 없습니다.")
             return None
         
         try:
-            # 파인튜닝용 데이터 형태로 변환
-            training_data = []
-            
-            for conv in conversations:
-                # TARGET 태그를 사용한 벡터 복원 학습 형태
-                conversation_text = conv.to_training_format()
+            # JSONL을 한 줄씩 읽으면서 JSON 배열로 바로 기록 (전체 대화를 메모리에 올리지 않음)
+            count = 0
+            with open(self.file_path, 'rb', buffering=1 << 20) as src, \
+                 open(output_path, 'wb', buffering=1 << 20) as dst:
+                dst.write(b"[\n")
                 
-                training_sample = {
-                    "input": f"<TARGET>{conversation_text}</TARGET>TARGET 태그 안의 내용만 출력하세요. 추가 설명은 필요 없습니다.",
-                    "output": conversation_text,
-                    "metadata": {
-                        "timestamp": conv.timestamp,
-                        "user_id": conv.user_id,
-                        "session_id": conv.session_id,
-                        "source": "conversation_collector",
-                        "text_length": len(conversation_text)
+                for line in src:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    conv = orjson.loads(line)
+                    
+                    # TARGET 태그를 사용한 벡터 복원 학습 형태
+                    conversation_text = format_conversation(conv["user_message"], conv["assistant_response"])
+                    
+                    training_sample = {
+                        "input": f"<TARGET>{conversation_text}</TARGET>TARGET 태그 안의 내용만 출력하세요. 추가 설명은 필요 없습니다.",
+                        "output": conversation_text,
+                        "metadata": {
+                            "timestamp": conv["timestamp"],
+                            "user_id": conv.get("user_id", "default"),
+                            "session_id": conv.get("session_id"),
+                            "source": "conversation_collector",
+                            "text_length": len(conversation_text)
+                        }
                     }
-                }
+                    
+                    if count:
+                        dst.write(b",\n")
+                    dst.write(orjson.dumps(training_sample, option=orjson.OPT_NON_STR_KEYS))
+                    count += 1
                 
-                training_data.append(training_sample)
+                dst.write(b"\n]\n")
             
-            # JSON 파일로 저장
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(training_data, f, ensure_ascii=False, indent=2)
+            if not count:
+                output_path.unlink()
+                print("⚠️ 내보낼 대화가 없습니다.")
+                return None
             
-            print(f"📊 파인튜닝 데이터셋 생성 완료: {len(training_data)}개 샘플")
+            print(f"📊 파인튜닝 데이터셋 생성 완료: {count}개 샘플")
             print(f"💾 저장 경로: {output_path}")
             
             return str(output_path)
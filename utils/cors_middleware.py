@@ -0,0 +1,90 @@
+from typing import Iterable
+
+ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+PREFLIGHT_MAX_AGE = b"600"
+
+class FastCORSMiddleware:
+    """경량 CORS ASGI 미들웨어
+
+    허용 origin은 frozenset으로 미리 만들어 O(1) 조회하고, 고정 응답 헤더는
+    bytes 튜플로 미리 계산합니다. Origin 헤더가 없는 요청(동일 출처, curl 등)은
+    헤더를 추가하지 않고 그대로 통과시킵니다.
+    """
+
+    def __init__(self, app, allowed_origins: Iterable[str]):
+        self.app = app
+        self.allowed_origins = frozenset(origin.encode("latin-1") for origin in allowed_origins)
+        self.allow_all = b"*" in self.allowed_origins
+
+        # allow_credentials=True 이므로 origin은 항상 요청 값을 그대로 돌려줌
+        self.simple_headers = (
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        )
+        self.preflight_headers = self.simple_headers + (
+            (b"access-control-allow-methods", ALLOW_METHODS),
+            (b"access-control-max-age", PREFLIGHT_MAX_AGE),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed = self.allow_all or origin in self.allowed_origins
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight(origin, allowed, request_headers, send)
+            return
+
+        if not allowed:
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = ((b"access-control-allow-origin", origin),) + self.simple_headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + list(cors_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _preflight(self, origin: bytes, allowed: bool, request_headers, send):
+        """프리플라이트(OPTIONS) 요청에 바로 응답"""
+        if not allowed:
+            body = b"Disallowed CORS origin"
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [(b"access-control-allow-origin", origin), *self.preflight_headers]
+        if request_headers is not None:
+            # allow_headers=["*"] 와 동일하게 요청한 헤더를 그대로 허용
+            headers.append((b"access-control-allow-headers", request_headers))
+        headers.append((b"content-length", b"0"))
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
@@ -1,50 +1,94 @@
 from typing import List, Dict, Any
-import json
+from collections import deque
+from itertools import islice
+import orjson
 import os
 from datetime import datetime
 
 class MessageQueue:
-    """대화 메모리 관리 클래스"""
+    """대화 메모리 관리 클래스 (deque(maxlen) 기반 고정 크기 버퍼)
+    
+    이벤트 루프 스레드에서만 호출된다고 가정하므로 별도 락을 두지 않습니다.
+    """
     
     def __init__(self, cnt=30):
         self.max_count = cnt
-        self.messages = []
         self.created_at = datetime.now()
+        self._reset()
     
-    def append(self, message: Dict[str, str]):
-        """메시지 추가"""
-        if len(self.messages) >= self.max_count:
-            self.messages.pop(0)  # 가장 오래된 메시지 제거
-        
-        # 타임스탬프 추가
-        message_with_timestamp = {
-            **message,
-            "timestamp": datetime.now().isoformat()
-        }
+    def _reset(self, messages: List[Dict[str, Any]] = None):
+        """버퍼 재구성 (최근 max_count개만 유지)"""
+        self._messages = deque(messages or [], maxlen=self.max_count)
+        self._view_cache = None
+        
+        # get_statistics용 카운터 (한 번 계산 후 추가/제거 시 증분 갱신)
+        self._role_counts = {"user": 0, "assistant": 0}
+        self._total_length = 0
+        for message in self._messages:
+            self._count(message, 1)
+    
+    def _count(self, message: Dict[str, Any], sign: int):
+        """메시지 하나를 통계 카운터에 더하거나(sign=1) 뺌(sign=-1)"""
+        role = message.get("role")
+        if role in self._role_counts:
+            self._role_counts[role] += sign
+        self._total_length += sign * len(message.get("content", ""))
+    
+    @staticmethod
+    def _format_line(message: Dict[str, Any]) -> str:
+        """view()에 들어가는 메시지 한 줄"""
+        return f"{message['role']}: {message['content']}"
+    
+    def _push(self, message: Dict[str, Any]):
+        """메시지 저장 (가득 차면 deque가 가장 오래된 메시지를 자동으로 제거)"""
+        evicted = self._messages[0] if len(self._messages) == self.max_count else None
+        self._messages.append(message)
+        
+        self._count(message, 1)
+        if evicted is not None:
+            self._count(evicted, -1)
         
-        self.messages.append(message_with_timestamp)
+        # 캐시된 view 문자열을 증분 갱신 (밀려난 첫 줄 제거 + 새 줄 추가)
+        if self._view_cache is not None:
+            view = self._view_cache
+            if evicted is not None:
+                view = view[len(self._format_line(evicted)) + 1:]
+            line = self._format_line(message)
+            self._view_cache = f"{view}\n{line}" if view else line
+    
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """오래된 순서의 메시지 리스트 (JSON 직렬화/슬라이싱용 복사본)"""
+        return list(self._messages)
+    
+    def append(self, message: Dict[str, str]):
+        """메시지 추가 (전달받은 딕셔너리에 타임스탬프를 직접 추가해 그대로 보관)"""
+        message["timestamp"] = datetime.now().isoformat()
+        self._push(message)
     
     def view(self) -> str:
-        """메모리 내용을 문자열로 반환"""
-        if not self.messages:
-            return ""
+        """메모리 내용을 문자열로 반환 (최초 1회 생성 후 append 시 증분 갱신)"""
+        if self._view_cache is None:
+            self._view_cache = "\n".join([
+                self._format_line(msg)
+                for msg in self._messages
+            ])
         
-        return "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in self.messages
-        ])
+        return self._view_cache
     
     def get_messages(self) -> List[Dict[str, Any]]:
         """전체 메시지 리스트 반환"""
-        return self.messages.copy()
+        return self.messages
     
     def get_recent_messages(self, count: int) -> List[Dict[str, Any]]:
-        """최근 N개 메시지 반환"""
-        return self.messages[-count:] if count > 0 else []
+        """최근 N개 메시지 반환 (전체를 복사하지 않고 필요한 구간만)"""
+        if count <= 0:
+            return []
+        return list(islice(self._messages, max(0, len(self._messages) - count), None))
     
     def clear(self):
         """메모리 초기화"""
-        self.messages.clear()
+        self._reset()
         print("🧠 메모리 초기화 완료")
     
     def save_to_file(self, filepath: str):
@@ -55,12 +99,12 @@ class MessageQueue:
             data = {
                 "created_at": self.created_at.isoformat(),
                 "max_count": self.max_count,
-                "message_count": len(self.messages),
-                "messages": self.messages
+                "message_count": len(self._messages),
+                "messages": list(self._messages)
             }
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
             
             print(f"💾 메모리 저장 완료: {filepath}")
             return True
@@ -72,16 +116,16 @@ class MessageQueue:
     def load_from_file(self, filepath: str):
         """파일에서 메모리 로드"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                data = orjson.loads(f.read())
             
-            self.messages = data.get("messages", [])
             self.max_count = data.get("max_count", 30)
+            self._reset(data.get("messages", []))
             
             if "created_at" in data:
                 self.created_at = datetime.fromisoformat(data["created_at"])
             
-            print(f"📂 메모리 로드 완료: {len(self.messages)}개 메시지")
+            print(f"📂 메모리 로드 완료: {len(self._messages)}개 메시지")
             return True
             
         except Exception as e:
@@ -90,26 +134,26 @@ class MessageQueue:
     
     def get_statistics(self) -> Dict[str, Any]:
         """메모리 통계 반환"""
-        if not self.messages:
+        if not self._messages:
             return {
                 "total_messages": 0,
                 "user_messages": 0,
                 "assistant_messages": 0,
                 "average_length": 0,
-                "memory_usage": "0%"
+                "memory_usage": "0%",
+                "max_capacity": self.max_count,
+                "created_at": self.created_at.isoformat()
             }
         
-        user_count = sum(1 for msg in self.messages if msg.get("role") == "user")
-        assistant_count = sum(1 for msg in self.messages if msg.get("role") == "assistant")
-        total_length = sum(len(msg.get("content", "")) for msg in self.messages)
-        avg_length = total_length / len(self.messages) if self.messages else 0
+        # 카운터는 append/evict 때 갱신되므로 메시지를 다시 순회하지 않음
+        avg_length = self._total_length / len(self._messages)
         
         return {
-            "total_messages": len(self.messages),
-            "user_messages": user_count,
-            "assistant_messages": assistant_count,
+            "total_messages": len(self._messages),
+            "user_messages": self._role_counts["user"],
+            "assistant_messages": self._role_counts["assistant"],
             "average_length": round(avg_length, 1),
-            "memory_usage": f"{len(self.messages) / self.max_count * 100:.1f}%",
+            "memory_usage": f"{len(self._messages) / self.max_count * 100:.1f}%",
             "max_capacity": self.max_count,
             "created_at": self.created_at.isoformat()
         }
@@ -118,37 +162,37 @@ class MessageQueue:
         """키워드로 메시지 검색"""
         matching_messages = []
         
-        for i, msg in enumerate(self.messages):
+        for i, msg in enumerate(self._messages):
             if keyword.lower() in msg.get("content", "").lower():
                 matching_messages.append({
                     **msg,
                     "index": i,
-                    "relative_position": f"{i + 1}/{len(self.messages)}"
+                    "relative_position": f"{i + 1}/{len(self._messages)}"
                 })
         
         return matching_messages
     
     def get_conversation_context(self, max_tokens: int = 2000) -> str:
         """토큰 제한을 고려한 대화 컨텍스트 반환"""
-        if not self.messages:
+        if not self._messages:
             return ""
         
         # 대략적인 토큰 계산 (1토큰 ≈ 4글자)
-        context = ""
+        parts = []
         token_count = 0
         
-        # 최신 메시지부터 역순으로 추가
-        for msg in reversed(self.messages):
-            content = f"{msg['role']}: {msg['content']}\n"
-            content_tokens = len(content) // 4  # 대략적 계산
+        # 최신 메시지부터 역순으로 모은 뒤 마지막에 한 번만 결합 (매번 앞에 붙이면 O(n²) 복사)
+        for msg in reversed(self._messages):
+            # "role: content\n" 길이를 문자열을 만들기 전에 계산해 예산 안에 드는 메시지만 포맷
+            content_tokens = (len(msg['role']) + len(msg['content']) + 3) // 4  # 대략적 계산
             
             if token_count + content_tokens > max_tokens:
                 break
             
-            context = content + context
+            parts.append(f"{msg['role']}: {msg['content']}\n")
             token_count += content_tokens
         
-        return context.strip()
+        return "".join(reversed(parts)).strip()
     
     def __str__(self) -> str:
         """문자열 표현"""
@@ -156,7 +200,7 @@ class MessageQueue:
     
     def __len__(self) -> int:
         """메시지 개수 반환"""
-        return len(self.messages)
+        return len(self._messages)
 
 
 class ConversationManager:
@@ -204,14 +248,13 @@ class ConversationManager:
         """모든 세션 목록 반환"""
         sessions_info = []
         
+        # 통계는 유지 중인 카운터에서 바로 계산 (message_count는 기존 응답 호환용으로 total_messages와 같은 값)
         for session_id, memory in self.sessions.items():
-            sessions_info.append({
-                "session_id": session_id,
-                "message_count": len(memory),
-                "created_at": memory.created_at.isoformat(),
-                "is_active": session_id == self.active_session,
-                **memory.get_statistics()
-            })
+            info = memory.get_statistics()
+            info["session_id"] = session_id
+            info["message_count"] = info["total_messages"]
+            info["is_active"] = session_id == self.active_session
+            sessions_info.append(info)
         
         return sessions_info
     
@@ -1,16 +1,55 @@
+import functools
+import importlib.util
 import os
-import json
+import orjson
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
+from collections import Counter, deque
+from itertools import islice
 
 from utils.conversation_collector import ConversationCollector
 from utils.automated_finetuning import AutomatedFinetuner
 
-@dataclass
+# 이벤트 로그 디스크 기록 주기 (N개 이벤트 또는 N초 중 먼저 도달하는 쪽)
+EVENTS_FLUSH_BATCH = 10
+EVENTS_FLUSH_INTERVAL = 5.0
+# JSONL 파일이 이 크기를 넘으면 메모리 버퍼(최근 이벤트)만 남기고 다시 씀
+EVENTS_COMPACT_BYTES = 10 * 1024 * 1024
+EVENT_LINE_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+# 웹훅 알림을 모으는 시간 (이 안에 발생한 이벤트는 한 번의 POST로 전송)
+WEBHOOK_BATCH_DELAY = 0.5
+WEBHOOK_HEADERS = {"Content-Type": "application/json"}
+
+# 웹훅은 requests가 설치된 경우에만 전송 (import는 첫 전송 시 한 번만)
+HAS_REQUESTS = importlib.util.find_spec("requests") is not None
+
+# 웹훅 전송용 세션 (keep-alive로 알림마다 TCP/TLS 핸드셰이크를 반복하지 않음)
+_webhook_session = None
+_webhook_session_lock = threading.Lock()
+
+def _get_webhook_session():
+    """연결 풀을 공유하는 requests 세션 반환 (웹훅을 처음 보낼 때 생성)"""
+    global _webhook_session
+    with _webhook_session_lock:
+        if _webhook_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _webhook_session = session
+        return _webhook_session
+
+@dataclass(slots=True)
 class MLOpsEvent:
     """MLOps 이벤트 데이터 클래스"""
     event_type: str  # "conversation_collected", "training_triggered", "training_completed", "error"
@@ -21,6 +60,9 @@ class MLOpsEvent:
 class MLOpsManager:
     """통합 MLOps 관리 시스템 (개선된 배치 처리)"""
     
+    # 모니터링이 꺼져 있어도 기록하고 웹훅으로 알리는 중요 이벤트
+    CRITICAL_EVENTS = frozenset({"training_completed", "training_failed", "error"})
+    
     def __init__(self, finetune_config: Dict[str, Any], conversation_config: Dict[str, Any]):
         self.finetune_config = finetune_config
         self.conversation_config = conversation_config
@@ -35,22 +77,53 @@ class MLOpsManager:
         self.monitoring_enabled = finetune_config.get("monitoring_enabled", True)
         self.webhook_url = finetune_config.get("webhook_url")
         
-        # 🚀 개선된 상태 관리
-        self.training_in_progress = False
+        # 🚀 개선된 상태 관리 (Event라 읽기에는 락이 필요 없음)
+        self._training_event = threading.Event()
         self.last_training_count = 0  # 마지막으로 학습한 시점의 총 대화 수
         self.current_model_version = None
-        self.events_log = []
-        self.pending_training_request = False  # 🆕 대기 중인 학습 요청
+        # 이벤트 로그 (최근 events_log_max개만 유지하는 고정 크기 버퍼)
+        self.events_log_max = finetune_config.get("events_log_max", 1000)
+        self.events_log = deque(maxlen=self.events_log_max)
+        self._event_type_counts = Counter()  # events_log 안의 타입별 이벤트 수 (증분 관리)
+        self._events_since_save = 0  # 마지막 저장 이후 추가된 이벤트 수
+        self._pending_training = threading.Event()  # 🆕 대기 중인 학습 요청
         
         # 스레드 관리
-        self.training_thread = None
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()  # try_begin_training의 확인-설정만 보호
+        self._shutdown_done = False  # shutdown 이벤트와 atexit 양쪽에서 호출되므로 중복 실행 방지
         
-        # 이벤트 로그 파일 경로
-        self.events_log_path = Path(finetune_config.get("data_path", "./data/finetune")) / "mlops_events.json"
+        # 파인튜닝 워커 (상주 스레드 1개 + 대기 작업 최대 1개)
+        self._train_queue = queue.Queue(maxsize=1)
+        self.training_thread = threading.Thread(
+            target=self._training_loop, name="mlops-training", daemon=True
+        )
+        self.training_thread.start()
+        
+        # 웹훅 전송 등 짧은 백그라운드 작업용 (알림마다 스레드를 만들지 않음)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mlops-bg")
+        self._webhook_buffer: List[MLOpsEvent] = []
+        self._webhook_lock = threading.Lock()
+        self._webhook_scheduled = False
+        
+        # 이벤트 로그 파일 경로 (한 줄에 이벤트 하나씩 이어 쓰는 JSONL)
+        data_path = Path(finetune_config.get("data_path", "./data/finetune"))
+        self.events_log_path = data_path / "mlops_events.jsonl"
+        self.legacy_events_log_path = data_path / "mlops_events.json"
+        self._events_file_bytes = 0
+        self._events_lock = threading.Lock()  # events_log 추가/스냅샷 보호
+        self._save_lock = threading.Lock()    # 파일 쓰기 직렬화
         
         # 기존 이벤트 로그 로드
         self._load_events_log()
+        self._recount_event_types()
+        
+        # 이벤트 로그 백그라운드 저장 스레드 (호출 스레드에서 파일을 쓰지 않음)
+        self._flush_event = threading.Event()
+        self._flusher_stop = False
+        self._event_flusher = threading.Thread(
+            target=self._event_flush_loop, name="mlops-event-flusher", daemon=True
+        )
+        self._event_flusher.start()
         
         # 초기화 이벤트
         self._log_event("system_initialized", {
@@ -64,89 +137,202 @@ class MLOpsManager:
         print(f"⚡ 자동 트리거: {'ON' if self.auto_trigger else 'OFF'}")
         print(f"🔧 파인튜너: {'활성화' if self.finetuner else '비활성화'}")
         print(f"📈 모니터링: {'활성화' if self.monitoring_enabled else '비활성화'}")
+        if self.webhook_url and not HAS_REQUESTS:
+            print("⚠️ requests 패키지가 없어 웹훅 알림을 보내지 않습니다.")
     
     def _load_events_log(self):
-        """이벤트 로그 로드"""
+        """이벤트 로그 로드 (파일 끝의 events_log_max개만 메모리에 유지)"""
         if self.events_log_path.exists():
             try:
-                with open(self.events_log_path, 'r', encoding='utf-8') as f:
-                    log_data = json.load(f)
-                    self.events_log = [MLOpsEvent(**event) for event in log_data]
+                with open(self.events_log_path, 'rb') as f:
+                    self.events_log = deque(self._parse_event_lines(f), maxlen=self.events_log_max)
+                self._events_file_bytes = self.events_log_path.stat().st_size
                 print(f"📂 이벤트 로그 로드: {len(self.events_log)}개 이벤트")
             except Exception as e:
                 print(f"⚠️ 이벤트 로그 로드 실패: {e}")
-                self.events_log = []
+                self.events_log = deque(maxlen=self.events_log_max)
+        
+        elif self.legacy_events_log_path.exists():
+            # 이전 JSON 배열 형식 → 다음 저장 때 JSONL 파일로 옮겨 씀
+            try:
+                with open(self.legacy_events_log_path, 'rb') as f:
+                    log_data = orjson.loads(f.read())
+                self.events_log = deque(
+                    map(self._event_from_dict, log_data),
+                    maxlen=self.events_log_max
+                )
+                self._events_since_save = len(self.events_log)
+                print(f"📂 이벤트 로그 로드 (이전 형식): {len(self.events_log)}개 이벤트")
+            except Exception as e:
+                print(f"⚠️ 이벤트 로그 로드 실패: {e}")
+                self.events_log = deque(maxlen=self.events_log_max)
+    
+    def _recount_event_types(self):
+        """events_log 전체를 한 번 훑어 타입별 이벤트 수 재계산 (로드/정리 후에만 호출)"""
+        self._event_type_counts = Counter(event.event_type for event in self.events_log)
     
-    def _save_events_log(self):
-        """이벤트 로그 저장"""
+    @staticmethod
+    def _event_from_dict(event: Dict[str, Any]) -> MLOpsEvent:
+        """저장된 이벤트 딕셔너리를 MLOpsEvent로 변환 (** 언패킹 없이 위치 인자로 생성)"""
+        return MLOpsEvent(event["event_type"], event["timestamp"], event["data"], event["message"])
+    
+    @classmethod
+    def _parse_event_lines(cls, lines):
+        """JSONL 줄을 MLOpsEvent로 변환 (기록 도중 잘린 줄은 건너뜀)"""
+        loads = orjson.loads
+        from_dict = cls._event_from_dict
+        for line in lines:
+            try:
+                yield from_dict(loads(line))
+            except Exception:
+                continue
+    
+    def _save_events_log(self, rewrite: bool = False):
+        """이벤트 로그 저장
+        
+        기본은 마지막 저장 이후 추가된 이벤트만 파일 끝에 이어 씁니다.
+        rewrite=True 이거나 파일이 EVENTS_COMPACT_BYTES를 넘으면 메모리 버퍼 전체로 다시 씁니다.
+        """
+        with self._save_lock:
+            with self._events_lock:
+                pending, self._events_since_save = self._events_since_save, 0
+                if rewrite or self._events_file_bytes > EVENTS_COMPACT_BYTES:
+                    rewrite = True
+                    events = tuple(self.events_log)
+                else:
+                    events = tuple(islice(reversed(self.events_log), pending))[::-1]
+            
+            if events or rewrite:
+                self._write_events_log(events, rewrite)
+    
+    def _write_events_log(self, events, rewrite: bool):
+        """이벤트 로그 파일 쓰기 (_save_lock 안에서 호출)"""
         try:
             self.events_log_path.parent.mkdir(parents=True, exist_ok=True)
+            data = b"".join(orjson.dumps(event, option=EVENT_LINE_OPTIONS) for event in events)
             
-            log_data = []
-            for event in self.events_log[-1000:]:  # 최근 1000개만 저장
-                log_data.append({
-                    "event_type": event.event_type,
-                    "timestamp": event.timestamp,
-                    "data": event.data,
-                    "message": event.message
-                })
-            
-            with open(self.events_log_path, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, ensure_ascii=False, indent=2)
+            if rewrite:
+                # 임시 파일에 쓴 뒤 교체해 중간에 실패해도 기존 로그 유지
+                temp_path = self.events_log_path.with_suffix(".jsonl.tmp")
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, self.events_log_path)
+                self._events_file_bytes = len(data)
+            else:
+                with open(self.events_log_path, 'ab') as f:
+                    f.write(data)
+                self._events_file_bytes += len(data)
                 
         except Exception as e:
             print(f"⚠️ 이벤트 로그 저장 실패: {e}")
     
+    def _event_flush_loop(self):
+        """새 이벤트를 모아 주기적으로 저장 (EVENTS_FLUSH_INTERVAL초 또는 EVENTS_FLUSH_BATCH개)"""
+        while not self._flusher_stop:
+            self._flush_event.wait(timeout=EVENTS_FLUSH_INTERVAL)
+            self._flush_event.clear()
+            if self._events_since_save:
+                self._save_events_log()
+    
     def _log_event(self, event_type: str, data: Dict[str, Any], message: str):
-        """이벤트 로깅"""
-        event = MLOpsEvent(
-            event_type=event_type,
-            timestamp=datetime.now().isoformat(),
-            data=data,
-            message=message
-        )
+        """이벤트 로깅 (모니터링 비활성화 시 중요 이벤트만 기록)"""
+        monitoring_enabled = self.monitoring_enabled
+        if not monitoring_enabled and event_type not in self.CRITICAL_EVENTS:
+            return
         
-        self.events_log.append(event)
+        event = MLOpsEvent(event_type, datetime.now().isoformat(), data, message)
+        
+        with self._events_lock:
+            # cleanup_old_data가 버퍼를 교체할 수 있으므로 락 안에서 지역 변수로 바인딩
+            events_log = self.events_log
+            counts = self._event_type_counts
+            
+            # 버퍼가 가득 차면 가장 오래된 이벤트가 밀려나므로 해당 타입 카운트 감소
+            if len(events_log) == self.events_log_max:
+                evicted_type = events_log[0].event_type
+                counts[evicted_type] -= 1
+                if counts[evicted_type] <= 0:
+                    del counts[evicted_type]
+            events_log.append(event)
+            counts[event_type] += 1
+            self._events_since_save += 1
+            pending = self._events_since_save
         
         # 이벤트 출력
-        if self.monitoring_enabled:
+        if monitoring_enabled:
             print(f"📋 [{event_type}] {message}")
         
-        # 로그 저장 (주기적으로)
-        if len(self.events_log) % 10 == 0:
-            self._save_events_log()
+        # 로그 저장은 백그라운드 스레드가 담당 (배치가 차면 바로 깨움)
+        if pending >= EVENTS_FLUSH_BATCH:
+            self._flush_event.set()
         
         # 웹훅 알림 (중요 이벤트만)
-        if event_type in ["training_completed", "training_failed", "error"] and self.webhook_url:
+        if event_type in self.CRITICAL_EVENTS and self.webhook_url:
             self._send_webhook_notification(event)
     
     def _send_webhook_notification(self, event: MLOpsEvent):
-        """웹훅 알림 전송 (비동기)"""
-        def send_webhook():
-            try:
-                import requests
-                
-                payload = {
-                    "text": f"🤖 MLOps 알림: {event.message}",
-                    "attachments": [{
-                        "color": "good" if "completed" in event.event_type else "danger",
-                        "fields": [
-                            {"title": "이벤트 타입", "value": event.event_type, "short": True},
-                            {"title": "시간", "value": event.timestamp, "short": True},
-                            {"title": "데이터", "value": json.dumps(event.data, ensure_ascii=False), "short": False}
-                        ]
-                    }]
-                }
-                
-                response = requests.post(self.webhook_url, json=payload, timeout=10)
-                response.raise_for_status()
-                
-            except Exception as e:
-                print(f"⚠️ 웹훅 전송 실패: {e}")
+        """웹훅 알림 예약 (WEBHOOK_BATCH_DELAY초 안에 발생한 이벤트는 한 번에 전송)"""
+        if not HAS_REQUESTS:
+            return
+        
+        with self._webhook_lock:
+            self._webhook_buffer.append(event)
+            if self._webhook_scheduled:
+                return
+            self._webhook_scheduled = True
         
-        # 백그라운드에서 실행
-        webhook_thread = threading.Thread(target=send_webhook, daemon=True)
-        webhook_thread.start()
+        # 백그라운드에서 실행 (종료 후에는 전송하지 않음)
+        try:
+            self._executor.submit(self._flush_webhooks)
+        except RuntimeError:
+            with self._webhook_lock:
+                self._webhook_scheduled = False
+    
+    @staticmethod
+    def _webhook_attachment(event: MLOpsEvent) -> Dict[str, Any]:
+        """이벤트 하나를 Slack 형식 attachment로 변환"""
+        return {
+            "color": "good" if "completed" in event.event_type else "danger",
+            "fields": [
+                {"title": "이벤트 타입", "value": event.event_type, "short": True},
+                {"title": "시간", "value": event.timestamp, "short": True},
+                {"title": "데이터", "value": orjson.dumps(event.data, option=orjson.OPT_NON_STR_KEYS).decode(), "short": False}
+            ]
+        }
+    
+    def _flush_webhooks(self):
+        """모인 웹훅 이벤트를 하나의 요청으로 전송 (executor에서 실행)"""
+        time.sleep(WEBHOOK_BATCH_DELAY)
+        
+        with self._webhook_lock:
+            batch, self._webhook_buffer = self._webhook_buffer, []
+            self._webhook_scheduled = False
+        
+        if not batch:
+            return
+        
+        try:
+            if len(batch) == 1:
+                text = f"🤖 MLOps 알림: {batch[0].message}"
+            else:
+                text = f"🤖 MLOps 알림 {len(batch)}건: {batch[-1].message}"
+            
+            payload = {
+                "text": text,
+                "attachments": [self._webhook_attachment(event) for event in batch]
+            }
+            
+            # payload는 orjson으로 한 번만 직렬화 (requests의 json= 은 표준 json으로 다시 인코딩)
+            response = _get_webhook_session().post(
+                self.webhook_url,
+                data=orjson.dumps(payload),
+                headers=WEBHOOK_HEADERS,
+                timeout=10
+            )
+            response.raise_for_status()
+            
+        except Exception as e:
+            print(f"⚠️ 웹훅 전송 실패: {e}")
     
     def _should_trigger_training(self) -> bool:
         """🚀 개선된 트리거 조건 판단"""
@@ -161,6 +347,29 @@ class MLOpsManager:
         current_count = self.collector.stats["total_collected"]
         return current_count - self.last_training_count
     
+    def preview_conversation(self, user_message: str, assistant_response: str) -> Dict[str, Any]:
+        """기록 후 _after_collected()가 결정할 결과와 같은 키의 예상 값 (실제 수집은 백그라운드에서 실행)
+        
+        수집 여부는 같은 유효성 검사로 미리 판단하고, 카운트는 수집이 반영된다고 가정한 값입니다.
+        training_triggered/training_queued는 백그라운드에서 결정되므로 항상 False이며,
+        scheduled=True로 예약된 값임을 표시합니다.
+        """
+        collected, _ = self.collector.is_valid_conversation(user_message, assistant_response)
+        current_count = self.collector.stats["total_collected"] + (1 if collected else 0)
+        new_data_count = current_count - self.last_training_count
+        
+        return {
+            "collected": collected,
+            "total_collected": current_count,
+            "new_data_count": new_data_count,
+            "should_train": collected and self.auto_trigger and self.finetuner is not None and new_data_count >= self.batch_size,
+            "pending_count": max(0, self.batch_size - new_data_count),
+            "training_triggered": False,
+            "training_queued": False,
+            "current_version": self.current_model_version,
+            "scheduled": True
+        }
+    
     def process_conversation(
         self, 
         user_message: str, 
@@ -169,22 +378,41 @@ class MLOpsManager:
         session_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """🚀 개선된 대화 처리 및 자동 파인튜닝 트리거"""
+        """🚀 개선된 대화 처리 및 자동 파인튜닝 트리거
         
-        # 1. 대화 수집
-        collected = self.collector.collect_conversation(
+        대화는 기록 대기열에 들어가고, 이벤트 로깅과 트리거 판단은 파일에 기록된 뒤
+        기록 스레드에서 _after_collected()가 그 시점의 정확한 수집 개수로 실행합니다.
+        반환값의 accepted는 대기열 추가 여부이며, 기록에 실패한 대화는 집계/트리거되지 않습니다.
+        """
+        accepted = self.collector.collect_conversation(
             user_message=user_message,
             assistant_response=assistant_response,
             user_id=user_id,
             session_id=session_id,
-            metadata=metadata
+            metadata=metadata,
+            on_written=functools.partial(
+                self._after_collected, user_id, session_id, len(user_message) + len(assistant_response)
+            )
         )
         
-        current_count = self.collector.stats["total_collected"]
-        new_data_count = self._get_new_data_count()
+        return {
+            "accepted": accepted,
+            "scheduled": accepted,
+            "current_version": self.current_model_version
+        }
+    
+    def _after_collected(
+        self,
+        user_id: str,
+        session_id: Optional[str],
+        message_length: int,
+        current_count: int
+    ) -> Dict[str, Any]:
+        """대화가 파일에 기록된 뒤 이벤트 로깅 및 파인튜닝 트리거 확인 (기록 스레드에서 호출)"""
+        new_data_count = current_count - self.last_training_count
         
         result = {
-            "collected": collected,
+            "collected": True,
             "total_collected": current_count,
             "new_data_count": new_data_count,  # 🆕 새 데이터 개수
             "should_train": False,
@@ -194,116 +422,89 @@ class MLOpsManager:
             "current_version": self.current_model_version
         }
         
-        if collected:
-            # 이벤트 로깅
-            self._log_event("conversation_collected", {
-                "user_id": user_id,
-                "session_id": session_id,
-                "total_count": current_count,
-                "new_data_count": new_data_count,
-                "message_length": len(user_message) + len(assistant_response)
-            }, f"새 대화 수집됨 (총 {current_count}개, 신규 {new_data_count}개)")
-            
-            if self.auto_trigger and self.finetuner:
-                # 🚀 개선된 트리거 로직
-                should_train = self._should_trigger_training()
-                result["should_train"] = should_train
-                result["pending_count"] = max(0, self.batch_size - new_data_count)
-                
-                if should_train:
+        # 이벤트 로깅
+        self._log_event("conversation_collected", {
+            "user_id": user_id,
+            "session_id": session_id,
+            "total_count": current_count,
+            "new_data_count": new_data_count,
+            "message_length": message_length
+        }, f"새 대화 수집됨 (총 {current_count}개, 신규 {new_data_count}개)")
+        
+        # 종료 중 마지막 기록에서는 새 학습을 시작하지 않음
+        if self.auto_trigger and self.finetuner and not self._shutdown_done:
+            # 🚀 개선된 트리거 로직 (_should_trigger_training과 같은 조건)
+            should_train = new_data_count >= self.batch_size
+            result["should_train"] = should_train
+            result["pending_count"] = max(0, self.batch_size - new_data_count)
+            
+            if should_train:
+                if not self.training_in_progress:
+                    # 즉시 파인튜닝 시작
+                    result["training_triggered"] = self._trigger_async_training()
+                else:
+                    # 🆕 진행 중이면 대기 요청 설정
+                    self._pending_training.set()
+                    result["training_queued"] = True
+                    
+                    # 확인 직후 학습이 끝났다면 워커가 대기 요청을 놓쳤을 수 있으므로 직접 확인
                     if not self.training_in_progress:
-                        # 즉시 파인튜닝 시작
-                        result["training_triggered"] = self._trigger_async_training()
-                    else:
-                        # 🆕 진행 중이면 대기 요청 설정
-                        self.pending_training_request = True
-                        result["training_queued"] = True
-                        
-                        self._log_event("training_queued", {
-                            "current_count": current_count,
-                            "new_data_count": new_data_count,
-                            "batch_size": self.batch_size
-                        }, f"파인튜닝 대기 설정 (신규 데이터 {new_data_count}개)")
-                        
-                        print(f"📋 파인튜닝 대기 설정: 현재 진행 중이므로 완료 후 실행 예정 (신규 {new_data_count}개)")
+                        self._check_pending_training()
+                    
+                    self._log_event("training_queued", {
+                        "current_count": current_count,
+                        "new_data_count": new_data_count,
+                        "batch_size": self.batch_size
+                    }, f"파인튜닝 대기 설정 (신규 데이터 {new_data_count}개)")
+                    
+                    print(f"📋 파인튜닝 대기 설정: 현재 진행 중이므로 완료 후 실행 예정 (신규 {new_data_count}개)")
         
         return result
     
+    @property
+    def training_in_progress(self) -> bool:
+        """파인튜닝 진행 여부"""
+        return self._training_event.is_set()
+    
+    @property
+    def pending_training_request(self) -> bool:
+        """진행 중인 학습이 끝난 뒤 실행할 대기 요청 여부"""
+        return self._pending_training.is_set()
+    
+    def try_begin_training(self) -> bool:
+        """파인튜닝 실행 권한을 원자적으로 획득 (이미 진행 중이면 False)
+        
+        확인과 설정을 같은 락 안에서 처리하므로 동시에 들어온 요청 중 하나만 성공합니다.
+        성공한 쪽은 학습이 끝나면 반드시 end_training()을 호출해야 합니다.
+        """
+        with self.lock:
+            if self._training_event.is_set():
+                return False
+            self._training_event.set()
+            return True
+    
+    def end_training(self):
+        """try_begin_training()으로 획득한 파인튜닝 실행 권한 해제 (락 불필요)"""
+        self._training_event.clear()
+    
     def _trigger_async_training(self) -> bool:
-        """🚀 개선된 비동기 파인튜닝 트리거"""
+        """🚀 비동기 파인튜닝 트리거 (상주 워커 스레드에 작업 전달)"""
         try:
-            with self.lock:
-                if self.training_in_progress:
-                    print("⚠️ 이미 파인튜닝이 진행 중입니다.")
-                    return False
-                
-                self.training_in_progress = True
-            
-            def training_worker():
-                try:
-                    current_count = self.collector.stats["total_collected"]
-                    new_data_count = current_count - self.last_training_count
-                    
-                    self._log_event("training_triggered", {
-                        "batch_size": self.batch_size,
-                        "total_conversations": current_count,
-                        "new_data_count": new_data_count,
-                        "trigger_type": "automatic"
-                    }, f"자동 파인튜닝 시작 (총 {current_count}개, 신규 {new_data_count}개)")
-                    
-                    print(f"🚀 자동 파인튜닝 시작: 총 {current_count}개 대화 (신규 {new_data_count}개)")
-                    success_result = self.start_finetuning()
-                    
-                    if success_result["success"]:
-                        # 🚀 성공 시 last_training_count 업데이트
-                        self.current_model_version = success_result["version"]
-                        self.last_training_count = current_count  # 현재 시점으로 업데이트
-                        
-                        self._log_event("training_completed", {
-                            "version": success_result["version"],
-                            "training_time": success_result["training_time"],
-                            "training_samples": success_result["training_samples"],
-                            "output_path": success_result["output_path"],
-                            "total_conversations": current_count,
-                            "new_data_processed": new_data_count
-                        }, f"파인튜닝 완료! 버전: {success_result['version']} (신규 {new_data_count}개 처리)")
-                        
-                        print(f"✅ 자동 파인튜닝 완료! 버전: {success_result['version']}")
-                        
-                        # 🚀 대기 중인 요청이 있으면 다시 트리거
-                        self._check_pending_training()
-                        
-                    else:
-                        self._log_event("training_failed", {
-                            "error": "Unknown error during training",
-                            "total_conversations": current_count,
-                            "new_data_count": new_data_count
-                        }, "파인튜닝 실패")
-                        
-                        print("❌ 자동 파인튜닝 실패!")
-                        
-                except Exception as e:
-                    self._log_event("training_failed", {
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                        "total_conversations": self.collector.stats["total_collected"]
-                    }, f"파인튜닝 오류: {str(e)}")
-                    
-                    print(f"❌ 자동 파인튜닝 오류: {e}")
-                    
-                finally:
-                    with self.lock:
-                        self.training_in_progress = False
-            
-            # 백그라운드 스레드에서 실행
-            self.training_thread = threading.Thread(target=training_worker, daemon=True)
-            self.training_thread.start()
+            if not self.try_begin_training():
+                print("⚠️ 이미 파인튜닝이 진행 중입니다.")
+                return False
             
+            # 실행 권한을 가진 쪽만 넣으므로 정상이라면 큐는 항상 비어 있음
+            self._train_queue.put_nowait(True)
             return True
             
+        except queue.Full:
+            self.end_training()
+            print("⚠️ 파인튜닝 작업이 이미 대기 중입니다.")
+            return False
+            
         except Exception as e:
-            with self.lock:
-                self.training_in_progress = False
+            self.end_training()
             
             self._log_event("error", {
                 "error": str(e),
@@ -313,6 +514,94 @@ class MLOpsManager:
             print(f"❌ 파인튜닝 트리거 실패: {e}")
             return False
     
+    def _training_loop(self):
+        """파인튜닝 워커 루프 (트리거마다 스레드를 새로 만들지 않고 재사용)"""
+        while True:
+            job = self._train_queue.get()
+            if job is None or self._shutdown_done:
+                break
+            
+            try:
+                success = self._run_auto_training()
+            finally:
+                self.end_training()
+            
+            # 🚀 실행 권한을 해제한 뒤 대기 중인 요청이 있으면 다시 트리거
+            if success:
+                self._check_pending_training()
+    
+    def _run_auto_training(self) -> bool:
+        """자동 파인튜닝 1회 실행 (워커 스레드에서 호출)
+        
+        성공하면 시작 정보를 포함한 training_completed 하나만 기록하고,
+        시작 이벤트(training_triggered)는 실패했을 때만 실패 이벤트 앞에 기록합니다.
+        """
+        trigger = None
+        try:
+            current_count = self.collector.stats["total_collected"]
+            new_data_count = current_count - self.last_training_count
+            
+            trigger = {
+                "batch_size": self.batch_size,
+                "total_conversations": current_count,
+                "new_data_count": new_data_count,
+                "trigger_type": "automatic",
+                "triggered_at": datetime.now().isoformat()
+            }
+            
+            print(f"🚀 자동 파인튜닝 시작: 총 {current_count}개 대화 (신규 {new_data_count}개)")
+            success_result = self.start_finetuning()
+            
+            if success_result["success"]:
+                # 🚀 성공 시 last_training_count 업데이트
+                self.current_model_version = success_result["version"]
+                self.last_training_count = current_count  # 현재 시점으로 업데이트
+                
+                self._log_event("training_completed", {
+                    "version": success_result["version"],
+                    "training_time": success_result["training_time"],
+                    "training_samples": success_result["training_samples"],
+                    "output_path": success_result["output_path"],
+                    "total_conversations": current_count,
+                    "new_data_processed": new_data_count,
+                    "batch_size": self.batch_size,
+                    "trigger_type": "automatic",
+                    "triggered_at": trigger["triggered_at"]
+                }, f"파인튜닝 완료! 버전: {success_result['version']} (신규 {new_data_count}개 처리)")
+                
+                print(f"✅ 자동 파인튜닝 완료! 버전: {success_result['version']}")
+                return True
+            
+            self._log_training_triggered(trigger)
+            self._log_event("training_failed", {
+                "error": "Unknown error during training",
+                "total_conversations": current_count,
+                "new_data_count": new_data_count
+            }, "파인튜닝 실패")
+            
+            print("❌ 자동 파인튜닝 실패!")
+            return False
+            
+        except Exception as e:
+            if trigger is not None:
+                self._log_training_triggered(trigger)
+            self._log_event("training_failed", {
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "total_conversations": self.collector.stats["total_collected"]
+            }, f"파인튜닝 오류: {str(e)}")
+            
+            print(f"❌ 자동 파인튜닝 오류: {e}")
+            return False
+    
+    def _log_training_triggered(self, trigger: Dict[str, Any]):
+        """실패 경로에서 미뤄 둔 파인튜닝 시작 이벤트 기록 (자동/수동 공통)"""
+        if trigger["trigger_type"] == "manual":
+            message = "수동 파인튜닝 트리거"
+        else:
+            message = f"자동 파인튜닝 시작 (총 {trigger['total_conversations']}개, 신규 {trigger['new_data_count']}개)"
+        self._log_event("training_triggered", trigger, message)
+    
     def _check_pending_training(self):
         """🚀 대기 중인 파인튜닝 요청 확인 및 실행"""
         if self.pending_training_request:
@@ -320,21 +609,16 @@ class MLOpsManager:
             new_data_count = self._get_new_data_count()
             
             if new_data_count >= self.batch_size:
-                self.pending_training_request = False
+                self._pending_training.clear()
                 
                 print(f"🔄 대기 중이던 파인튜닝 시작: 신규 {new_data_count}개 데이터")
                 
-                # 약간의 지연 후 다시 트리거 (이전 작업 완전 완료 보장)
-                def delayed_trigger():
-                    time.sleep(1)  # 1초 대기
-                    self._trigger_async_training()
-                
-                delayed_thread = threading.Thread(target=delayed_trigger, daemon=True)
-                delayed_thread.start()
+                # 이전 작업의 실행 권한은 이미 해제됐으므로 바로 다시 트리거
+                self._trigger_async_training()
                 
             else:
                 # 아직 배치 크기에 도달하지 않음
-                self.pending_training_request = False
+                self._pending_training.clear()
                 print(f"📋 대기 요청 해제: 신규 데이터 {new_data_count}개로 배치 크기 미달")
     
     def start_finetuning(self, force: bool = False) -> Dict[str, Any]:
@@ -422,7 +706,7 @@ class MLOpsManager:
         
         # 최근 이벤트
         recent_events = []
-        for event in self.events_log[-10:]:  # 최근 10개
+        for event in reversed(list(islice(reversed(self.events_log), 10))):  # 최근 10개
             recent_events.append({
                 "type": event.event_type,
                 "timestamp": event.timestamp,
@@ -454,14 +738,16 @@ class MLOpsManager:
     
     def get_events_log(self, event_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """이벤트 로그 조회"""
-        events = self.events_log
-        
-        # 타입 필터링
-        if event_type:
-            events = [e for e in events if e.event_type == event_type]
+        # 최신 이벤트부터 역순으로 훑어 limit개가 모이면 중단
+        # (전체 스냅샷 대신 락을 잡아 다른 스레드의 append와 겹치지 않게 함)
+        with self._events_lock:
+            events = reversed(self.events_log)
+            if event_type:
+                events = (e for e in events if e.event_type == event_type)
+            events = list(islice(events, limit))
         
-        # 최신 순으로 제한
-        events = events[-limit:]
+        # 반환 순서는 기존과 같이 오래된 것부터
+        events.reverse()
         
         return [{
             "type": event.event_type,
@@ -505,21 +791,20 @@ class MLOpsManager:
         # 대화 수집 성능
         collector_stats = self.collector.get_stats()
         
-        # 파인튜닝 성능
-        training_history = self.get_training_history() if self.finetuner else []
-        
-        avg_training_time = 0
-        total_trainings = len([h for h in training_history if h.get("success", False)])
-        
-        if total_trainings > 0:
-            successful_trainings = [h for h in training_history if h.get("success", False)]
-            avg_training_time = sum(h.get("training_time_seconds", 0) for h in successful_trainings) / len(successful_trainings)
+        # 파인튜닝 성능 (파인튜너가 기록 시점마다 갱신하는 누적 카운터 사용)
+        if self.finetuner:
+            training_summary = self.finetuner.get_training_summary()
+        else:
+            training_summary = {
+                "total_trainings": 0,
+                "failed_trainings": 0,
+                "avg_training_time_seconds": 0,
+                "success_rate": 0
+            }
         
-        # 이벤트 통계
-        event_stats = {}
-        for event in self.events_log:
-            event_type = event.event_type
-            event_stats[event_type] = event_stats.get(event_type, 0) + 1
+        # 이벤트 통계 (_log_event에서 증분 관리하는 카운터 사용)
+        with self._events_lock:
+            event_stats = dict(self._event_type_counts)
         
         return {
             "collection": {
@@ -528,12 +813,7 @@ class MLOpsManager:
                 "collection_rate": collector_stats["total_collected"] / (collector_stats["total_collected"] + collector_stats["filtered_out"]) * 100 if (collector_stats["total_collected"] + collector_stats["filtered_out"]) > 0 else 0,
                 "file_size_kb": collector_stats["file_size_kb"]
             },
-            "training": {
-                "total_trainings": total_trainings,
-                "failed_trainings": len(training_history) - total_trainings,
-                "avg_training_time_seconds": avg_training_time,
-                "success_rate": total_trainings / len(training_history) * 100 if training_history else 0
-            },
+            "training": training_summary,
             "events": event_stats,
             "system": {
                 "uptime_hours": (datetime.now() - datetime.fromisoformat(self.events_log[0].timestamp)).total_seconds() / 3600 if self.events_log else 0,
@@ -548,15 +828,22 @@ class MLOpsManager:
             cutoff_date = datetime.now() - timedelta(days=keep_days)
             
             # 오래된 이벤트 로그 정리
-            original_count = len(self.events_log)
-            self.events_log = [
-                event for event in self.events_log 
-                if datetime.fromisoformat(event.timestamp) > cutoff_date
-            ]
-            removed_events = original_count - len(self.events_log)
+            # 이벤트는 기록 순서(=시간 순)로 쌓이고 같은 isoformat 문자열은 사전순이 곧 시간순이므로
+            # 앞쪽에서 기준 시각 이전 이벤트만 꺼내면 됨 (타임스탬프 파싱 없음)
+            cutoff = cutoff_date.isoformat()
+            removed_events = 0
+            with self._events_lock:
+                events_log = self.events_log
+                counts = self._event_type_counts
+                while events_log and events_log[0].timestamp <= cutoff:
+                    evicted_type = events_log.popleft().event_type
+                    counts[evicted_type] -= 1
+                    if counts[evicted_type] <= 0:
+                        del counts[evicted_type]
+                    removed_events += 1
             
-            # 로그 저장
-            self._save_events_log()
+            # 남은 이벤트로 로그 파일 다시 쓰기
+            self._save_events_log(rewrite=True)
             
             # 정리 이벤트 로깅
             self._log_event("cleanup_completed", {
@@ -583,17 +870,35 @@ class MLOpsManager:
             }
     
     def shutdown(self):
-        """MLOps 매니저 종료"""
+        """MLOps 매니저 종료 (여러 번 호출돼도 한 번만 실행)"""
+        if self._shutdown_done:
+            return
+        self._shutdown_done = True
+        
         try:
+            # 워커 종료 신호 (진행 중인 작업이 끝나면 루프 탈출)
+            try:
+                self._train_queue.put_nowait(None)
+            except queue.Full:
+                pass  # 대기 작업이 있어도 _shutdown_done 확인 후 종료됨
+            
             # 진행 중인 훈련 대기
-            if self.training_in_progress and self.training_thread:
+            if self.training_in_progress:
                 print("🔄 진행 중인 파인튜닝 완료 대기 중...")
                 self.training_thread.join(timeout=300)  # 5분 대기
             
-            # 최종 이벤트 로그 저장
-            self._save_events_log()
+            # 기록 대기 중인 대화 저장 (기록 후 이벤트가 로그에 포함되도록 이벤트 저장 전에 실행)
+            self.collector.close()
             
+            # 종료 이벤트까지 포함해 최종 이벤트 로그 저장
             self._log_event("system_shutdown", {}, "MLOps 시스템이 종료되었습니다.")
+            self._flusher_stop = True
+            self._flush_event.set()
+            self._event_flusher.join(timeout=10)
+            self._save_events_log()
+            
+            # 전송 중인 웹훅 마무리
+            self._executor.shutdown(wait=True)
             
             print("🛑 MLOps 매니저 종료 완료")
             
@@ -0,0 +1,122 @@
+import hashlib
+import time
+import numpy as np
+from typing import Dict, Any, Optional
+
+class SemanticCache:
+    """의미 기반 응답 캐시 (코사인 유사도)
+
+    같은 질문이라도 검색 문맥이 다르면 답이 달라지므로,
+    조회 시 전달한 context_key(문맥 해시)가 같고 ttl초 안에 저장된 항목만 적중으로 인정합니다.
+    """
+
+    def __init__(self, config: dict):
+        self.enabled = config.get("enabled", False)
+        self.capacity = config.get("size", 1024)
+        self.threshold = config.get("threshold", 0.97)
+        self.ttl = config.get("ttl", 3600.0)  # 0이면 만료 없음
+
+        # 임베딩은 첫 삽입 시 차원을 알고 나서 할당 (N, dim)
+        self._embeddings = None
+        self._responses = [None] * self.capacity
+        self._context_keys = np.zeros(self.capacity, dtype=np.int64)
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+
+        # 링 버퍼 상태
+        self._next = 0
+        self._size = 0
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+
+        print(f"⚡ 시맨틱 캐시 초기화: {'활성화' if self.enabled else '비활성화'} "
+              f"(크기: {self.capacity}, 임계값: {self.threshold})")
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """L2 정규화된 float32 벡터 반환"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return vec
+
+    @staticmethod
+    def context_key(*parts: str) -> int:
+        """응답에 영향을 주는 문맥(검색 결과 문서 등)의 64bit 해시"""
+        digest = hashlib.blake2b(digest_size=8)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return int.from_bytes(digest.digest(), "little", signed=True)
+    
+    def lookup(self, embedding, context_key: int) -> Optional[str]:
+        """같은 문맥에서 유사한 이전 질의가 있으면 캐시된 응답 반환"""
+        if not self.enabled:
+            return None
+
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        query = self._normalize(embedding)
+
+        # 정규화된 행렬과의 내적 = 코사인 유사도 (단일 BLAS 호출)
+        similarities = self._embeddings[:self._size] @ query
+        
+        # 문맥이 다르거나 만료된 항목은 후보에서 제외
+        excluded = self._context_keys[:self._size] != context_key
+        if self.ttl > 0:
+            excluded |= self._timestamps[:self._size] < time.time() - self.ttl
+        similarities[excluded] = -np.inf
+        best = int(np.argmax(similarities))
+
+        if similarities[best] >= self.threshold:
+            self.hits += 1
+            return self._responses[best]
+
+        self.misses += 1
+        return None
+
+    def insert(self, embedding, response: str, context_key: int):
+        """질의 임베딩과 응답을 문맥 해시와 함께 캐시에 저장 (가장 오래된 항목 덮어쓰기)"""
+        if not self.enabled:
+            return
+
+        vec = self._normalize(embedding)
+
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+
+        self._embeddings[self._next] = vec
+        self._responses[self._next] = response
+        self._context_keys[self._next] = context_key
+        self._timestamps[self._next] = time.time()
+
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        """캐시 초기화"""
+        self._embeddings = None
+        self._responses = [None] * self.capacity
+        self._context_keys[:] = 0
+        self._timestamps[:] = 0
+        self._next = 0
+        self._size = 0
+        print("⚡ 시맨틱 캐시 초기화 완료")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 통계 반환"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total * 100 if total > 0 else 0
+        }